@@ -23,16 +23,18 @@ import numpy as np
 import traceback
 import os
 
+_IS_POSIX = os.name == "posix"  # Linux, macOS, etc.
+
 def normalize_path(path: str) -> str:
     """
     If running on Linux, convert Windows-style backslashes to forward slashes.
     Otherwise, return the path unchanged.
     """
-    if os.name == "posix":  # Linux, macOS, etc.
+    if _IS_POSIX and "\\" in path:
         return path.replace("\\", "/")
     return path
 
-from NLGCL.recomendation_NLGCL import setup_recbole_model,recommend_topk
+from NLGCL.recomendation_NLGCL import setup_recbole_model,recommend_topk,DEFAULT_MODEL
 
 
 rich_pretty.install()
@@ -111,7 +113,7 @@ async def load_model_background():
         
         # REMPLACE LA LIGNE QUI CRASH PAR CELLE-CI :
         NLGCL_model, NLGCL_dataset, NLGCL_train_data, NLGCL_device = setup_recbole_model(
-            model_path=normalize_path("NLGCL/saved/NLGCL-Dec-02-2025_17-09-34.pth"),
+            model_path=normalize_path(f"NLGCL/saved/{DEFAULT_MODEL}"),
             dataset_name="game",
             config_file_list=[normalize_path("NLGCL/properties/game.yaml")]
         )
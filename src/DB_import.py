@@ -1,24 +1,30 @@
 from __future__ import annotations
 
 import argparse
+import atexit
+import codecs
 import csv
 import json
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
-from pymongo import ASCENDING, DESCENDING, InsertOne, MongoClient, UpdateOne
+import bson
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel, InsertOne, MongoClient, UpdateOne, WriteConcern
 from pymongo.errors import BulkWriteError
 from rich.logging import RichHandler
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import urllib.request
 from urllib.error import HTTPError, URLError
 import zipfile
 import shutil
 import io
 import os
-from decimal import Decimal
+import threading
+from contextlib import nullcontext
+from functools import lru_cache, partial
 
 # ---------------------------------------------------------------------------
 # Logging setup
@@ -28,8 +34,33 @@ LOGGER_NAME = "steam_import"
 logger = logging.getLogger(LOGGER_NAME)
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
 import requests
-import ijson
+from requests.adapters import HTTPAdapter
+# Backend C de ijson (inclus dans les wheels), puis yajl2 (libyajl système), puis pur Python
+try:
+    import ijson.backends.yajl2_c as ijson
+except ImportError:
+    try:
+        import ijson.backends.yajl2 as ijson
+    except ImportError:
+        import ijson.backends.python as ijson
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+    _ArrowInvalid = pa.ArrowInvalid
+except ImportError:  # pyarrow est optionnel, module csv en secours
+    pa = pc = pacsv = None
+    _ArrowInvalid = ()
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson est optionnel, json de la stdlib en secours
+    _json_loads = json.loads
 
 GAMES_JSON_URL = (
     "https://data.mendeley.com/public-files/datasets/jxy85cr3th/files/"
@@ -40,28 +71,86 @@ REVIEWS_ZIP_URL = (
     "273898e9-90f1-49ff-8d62-df52e67341b3/file_downloaded"
 )
 
+# Sans S3 : lire le ZIP des reviews directement sur Mendeley (HTTP Range) au lieu de le télécharger
+REVIEWS_STREAM_HTTP = os.getenv("REVIEWS_STREAM_HTTP", "").lower() in ("1", "true", "yes")
+ZIP_TAIL_CACHE_BYTES = 8 * 1024 * 1024
+
 S3_BUCKET = os.getenv("S3_BUCKET")
 S3_GAMES_KEY = "data/games.json"
 S3_REVIEWS_KEY = "data/reviews_download.zip"
 
+# Multipart S3 : 10 parts de 64MB en vol pendant que la suite se télécharge
+S3_UPLOAD_CONFIG = TransferConfig(
+    multipart_chunksize=64 * 1024 * 1024,
+    max_concurrency=10,
+    use_threads=True,
+)
+
+# Client S3 unique par processus (thread-safe une fois créé ; la création
+# via la session par défaut ne l'est pas, d'où le verrou). Comme pour les
+# MongoClient, un processus du pool recrée le sien au lieu d'hériter des
+# connexions du parent.
+_S3 = None
+_S3_PID = None
+_S3_LOCK = threading.Lock()
+
+
+def _s3():
+    global _S3, _S3_PID
+    if _S3 is None or _S3_PID != os.getpid():
+        with _S3_LOCK:
+            if _S3 is None or _S3_PID != os.getpid():
+                _S3 = boto3.client('s3')
+                _S3_PID = os.getpid()
+    return _S3
+
+# Session HTTP partagée par les lectures Range (REVIEWS_STREAM_HTTP) : les
+# connexions keep-alive sont réutilisées d'un CSV à l'autre au lieu d'un
+# handshake TCP/TLS par ZIP ouvert. Même cycle de vie que _s3().
+_HTTP_SESSION = None
+_HTTP_SESSION_PID = None
+_HTTP_SESSION_LOCK = threading.Lock()
+HTTP_POOL_SIZE = 64
+
+
+def _http_session() -> requests.Session:
+    global _HTTP_SESSION, _HTTP_SESSION_PID
+    if _HTTP_SESSION is None or _HTTP_SESSION_PID != os.getpid():
+        with _HTTP_SESSION_LOCK:
+            if _HTTP_SESSION is None or _HTTP_SESSION_PID != os.getpid():
+                session = requests.Session()
+                # Pool par hôte assez grand pour tous les workers (10 par défaut)
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _HTTP_SESSION = session
+                _HTTP_SESSION_PID = os.getpid()
+    return _HTTP_SESSION
+
 def download_and_upload_to_s3(url, bucket_name, s3_key):
     """Télécharge le fichier de Mendeley et l'envoie sur S3 sans stockage local."""
-    s3 = boto3.client('s3')
+    s3 = _s3()
     logger.info(f"Démarrage du streaming vers S3: s3://{bucket_name}/{s3_key}")
     
     with requests.get(url, stream=True) as r:
         r.raise_for_status()
-        # upload_fileobj accepte un flux binaire (r.raw)
-        s3.upload_fileobj(r.raw, bucket_name, s3_key)
+        # Si le serveur compresse la réponse (gzip), r.raw doit rendre les octets décodés
+        r.raw.decode_content = True
+        # upload_fileobj accepte un flux binaire (r.raw) ; parts de 64MB envoyées en parallèle
+        s3.upload_fileobj(r.raw, bucket_name, s3_key, Config=S3_UPLOAD_CONFIG)
     logger.info("Transfert S3 terminé.")
 
 def ensure_reviews_zip_on_s3(bucket_name, s3_key, download_url):
     """Vérifie si le fichier est sur S3, sinon le télécharge."""
-    s3 = boto3.client('s3')
+    s3 = _s3()
     try:
         s3.head_object(Bucket=bucket_name, Key=s3_key)
         logger.info("Le fichier ZIP est déjà présent sur S3.")
-    except:
+    except ClientError as e:
+        # Seul un objet absent déclenche le (long) téléchargement ; une erreur
+        # transitoire ou de droits remonte au lieu de tout re-uploader
+        if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey"):
+            raise
         logger.info("Fichier ZIP absent de S3. Téléchargement initial en cours...")
         download_and_upload_to_s3(download_url, bucket_name, s3_key)
 
@@ -96,14 +185,39 @@ ENV_PATH = BASE_DIR / ".env"  # src/.env
 DATA_DIR = Path("/tmp/data")
 GAMES_JSON_PATH = DATA_DIR / "games.json"
 REVIEWS_DIR = DATA_DIR / "Game Reviews"
+REVIEWS_CHECKPOINT_PATH = DATA_DIR / ".reviews_checkpoint.jsonl"
 
 # Collections
 GAMES_COLLECTION = "games"
 REVIEWS_COLLECTION = "reviews"
 USERS_COLLECTION = "users"
+META_COLLECTION = "import_meta"  # marqueurs d'import (build incrémental des users)
+
+# Batch sizes for bulk writes (server maxWriteBatchSize is 100,000)
+# Reviews: documents per insert_many, capped so a batch stays under 16MB of BSON
+# (estimated from a sample of the first docs of each file).
+# REVIEW_BATCH_SIZE (ancien nom de la variable) reste lu pour les déploiements existants
+BATCH_SIZE_REVIEWS = int(os.environ.get("BATCH_SIZE_REVIEWS") or os.environ.get("REVIEW_BATCH_SIZE", "50000"))
+REVIEW_BATCH_MAX_BYTES = 16 * 1024 * 1024
+_BATCH_SIZE_SAMPLE = 100
+
+# Review CSVs up to this (uncompressed) size are decoded in one go (per worker)
+REVIEW_CSV_INMEMORY_MAX_BYTES = 64 * 1024 * 1024
+
+# Read size for HTTP downloads (the default 16KB means ~260k reads for the 4GB ZIP)
+DOWNLOAD_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Games: upserts per bulk_write (bigger ops than inserts, so a lower count)
+BATCH_SIZE_GAMES = 10_000
+
+# Users written from the map collected during the reviews import
+BATCH_SIZE_USERS = 50_000
 
-# Batch size for bulk inserts
-BATCH_SIZE = 1000000
+# games.json files up to this size are parsed in one go (orjson), bigger ones
+# are streamed with ijson to keep memory bounded.
+GAMES_JSON_INMEMORY_MAX_BYTES = int(
+    os.environ.get("GAMES_JSON_INMEMORY_MAX_BYTES", str(512 * 1024 * 1024))
+)
 
 
 # ---------------------------------------------------------------------------
@@ -121,25 +235,29 @@ def load_env(env_path: Path) -> Dict[str, str]:
         logger.warning("[env] .env file not found at %s", env_path)
         return env_vars
 
-    for line_no, line in enumerate(env_path.read_text().splitlines(), start=1):
-        raw_line = line
-        line = line.strip()
-        if not line or line.startswith("#"):
-            logger.debug("[env] Skipping line %d: %r", line_no, raw_line)
-            continue
-        if "=" not in line:
-            logger.warning("[env] Invalid line %d (no '='): %r", line_no, raw_line)
-            continue
-        k, v = line.split("=", 1)
-        key = k.strip()
-        value = v.strip()
-        env_vars[key] = value
-
-    masked_env = {
-        k: ("***" if "PASS" in k.upper() else v) for k, v in env_vars.items()
-    }
-    logger.debug("[env] Loaded keys: %s", list(masked_env.keys()))
-    logger.debug("[env] Values (masked): %r", masked_env)
+    debug = logger.isEnabledFor(logging.DEBUG)
+    with env_path.open("r", encoding="utf-8") as fh:
+        for line_no, raw_line in enumerate(fh, start=1):
+            raw_line = raw_line.rstrip("\r\n")
+            line = raw_line.strip()
+            if not line or line.startswith("#"):
+                if debug:
+                    logger.debug("[env] Skipping line %d: %r", line_no, raw_line)
+                continue
+            if "=" not in line:
+                logger.warning("[env] Invalid line %d (no '='): %r", line_no, raw_line)
+                continue
+            k, v = line.split("=", 1)
+            key = k.strip()
+            value = v.strip()
+            env_vars[key] = value
+
+    if debug:
+        masked_env = {
+            k: ("***" if "PASS" in k.upper() else v) for k, v in env_vars.items()
+        }
+        logger.debug("[env] Loaded keys: %s", list(masked_env.keys()))
+        logger.debug("[env] Values (masked): %r", masked_env)
     return env_vars
 
 
@@ -147,13 +265,44 @@ def load_env(env_path: Path) -> Dict[str, str]:
 # Utility: Mongo connection
 # ---------------------------------------------------------------------------
 
-def get_db_from_env(env: Dict[str, str]):
+# One MongoClient per (process, URI): clients are shared across threads but
+# must never be inherited through fork, so the PID is part of the key.
+_CLIENT_CACHE: Dict[Tuple[int, str], MongoClient] = {}
+
+
+def _close_cached_clients() -> None:
+    for client in _CLIENT_CACHE.values():
+        client.close()
+
+
+atexit.register(_close_cached_clients)
+
+
+def _get_client(uri: str, max_pool_size: int) -> MongoClient:
+    key = (os.getpid(), uri)
+    client = _CLIENT_CACHE.get(key)
+    if client is None:
+        client = MongoClient(
+            uri,
+            maxPoolSize=max_pool_size,
+            minPoolSize=10,
+            retryWrites=True,
+        )
+        _CLIENT_CACHE[key] = client
+        logger.debug("[mongo] MongoClient created (pid=%d, maxPoolSize=%d)", key[0], max_pool_size)
+    return client
+
+
+def get_db_from_env(env: Dict[str, str], max_pool_size: int = 200):
     """
     Build MongoClient from .env content.
     Priority:
       - MONGO_URI if present
       - else DB_USER/DB_PASSWORD + DB_IP/DB_PORT + DB_AUTH_SOURCE
       - DB_NAME from env, default "Steam_Project" if missing
+
+    max_pool_size should cover the number of concurrent import workers.
+    The client is cached per process, so repeated calls reuse the same pool.
     """
     db_name = env.get("DB_NAME", "Steam_Project")
     logger.debug("[mongo] Target DB_NAME: %s", db_name)
@@ -162,7 +311,7 @@ def get_db_from_env(env: Dict[str, str]):
     if mongo_uri:
         logger.info("[mongo] Connecting using MONGO_URI (masked) to DB '%s'...", db_name)
         logger.debug("[mongo] Raw MONGO_URI length: %d chars", len(mongo_uri))
-        client = MongoClient(mongo_uri)
+        client = _get_client(mongo_uri, max_pool_size)
         return client[db_name]
 
     db_user = env.get("DB_USER")
@@ -189,8 +338,7 @@ def get_db_from_env(env: Dict[str, str]):
         )
         uri = f"mongodb://{db_ip}:{db_port}/"
 
-    client = MongoClient(uri)
-    logger.debug("[mongo] MongoClient created")
+    client = _get_client(uri, max_pool_size)
     return client[db_name]
 
 
@@ -198,6 +346,19 @@ def get_db_from_env(env: Dict[str, str]):
 # Parsing helpers
 # ---------------------------------------------------------------------------
 
+# English month names and abbreviations ('october', 'oct', ...) -> month number
+_MONTHS = {
+    name.lower(): i
+    for i, full in enumerate(
+        ("January", "February", "March", "April", "May", "June", "July",
+         "August", "September", "October", "November", "December"),
+        start=1,
+    )
+    for name in (full, full[:3])
+}
+_MONTHS["sept"] = 9
+
+
 def parse_date_mdy_long(s: Optional[str]) -> Optional[datetime]:
     """
     Parse date strings like:
@@ -205,19 +366,25 @@ def parse_date_mdy_long(s: Optional[str]) -> Optional[datetime]:
       - 'Oct 22, 2024'
       - '2024-10-22'
     -> datetime or None
+
+    Called once per row: ISO dates go through fromisoformat, month-name dates
+    are split and looked up in _MONTHS (no strptime, which re-parses its
+    format string on every call); anything else yields None without raising.
     """
     if not s:
         return None
     s = s.strip()
-    formats = ("%B %d, %Y", "%b %d, %Y", "%Y-%m-%d")
-    for fmt in formats:
-        try:
-            dt = datetime.strptime(s, fmt)
-            logger.debug("[parse_date] Parsed %r with format %r -> %s", s, fmt, dt.isoformat())
-            return dt
-        except ValueError:
-            continue
-    logger.debug("[parse_date] Could not parse date: %r", s)
+    try:
+        if len(s) >= 10 and s[4] == "-" and s[7] == "-":
+            return datetime.fromisoformat(s[:10])
+        parts = s.replace(",", " ").split()
+        if len(parts) == 3:
+            month = _MONTHS.get(parts[0].lower())
+            if month is not None:
+                return datetime(int(parts[2]), month, int(parts[1]))
+    except ValueError:
+        pass
+    # Pas de log ici : appelée une fois par review, une date illisible vaut None
     return None
 
 def coerce_bool_recommend(s: Optional[str]) -> Optional[bool]:
@@ -228,7 +395,6 @@ def coerce_bool_recommend(s: Optional[str]) -> Optional[bool]:
         return True
     if t == "not recommended":
         return False
-    logger.debug("[recommend] Unexpected value for recommend: %r", s)
     return None
 
 
@@ -236,86 +402,180 @@ def coerce_bool_early_access(s: Optional[str]) -> bool:
     # Null/empty -> False; "Early Access Review" -> True
     if not s:
         return False
-    result = s.strip().lower() == "early access review"
-    logger.debug("[early_access] %r -> %s", s, result)
-    return result
+    return s.strip().lower() == "early access review"
 
 
 # ---------------------------------------------------------------------------
 # Games import
 # ---------------------------------------------------------------------------
 
-def load_games_array(games_json_path: Path) -> List[dict]:
+def _json_top_level_is_array(f) -> bool:
+    """Look at the first non-whitespace byte of a binary file, then rewind it."""
+    first = b""
+    while True:
+        chunk = f.read(64)
+        if not chunk:
+            break
+        first = chunk.lstrip()[:1]
+        if first:
+            break
+    f.seek(0)
+    return first == b"["
+
+
+def _load_games_in_memory(f) -> Iterator[dict]:
+    """Parse the whole games.json at once (orjson when available)."""
+    try:
+        data = _json_loads(f.read())  # orjson n'accepte pas d'objet fichier
+    except ValueError as e:  # json.JSONDecodeError et orjson.JSONDecodeError
+        logger.error("[games] Invalid JSON: %s", e)
+        raise
+
+    if isinstance(data, dict):
+        logger.debug("[games] JSON is object; using keys as _id")
+        return ({**v, "_id": int(k) if str(k).isdigit() else k} for k, v in data.items())
+    logger.debug("[games] JSON is array; documents count: %d", len(data))
+    return iter(data)
+
+
+@lru_cache(maxsize=8192)
+def _parse_release_date(value: str) -> Optional[datetime]:
+    # Beaucoup de jeux partagent la même date de sortie : on ne parse chaque chaîne qu'une fois
+    return parse_date_mdy_long(value)
+
+
+def _normalize_game_doc(doc: dict) -> dict:
+    """Prépare un jeu pour MongoDB (release_date en datetime), en place."""
+    rd = doc.get("release_date")
+    if isinstance(rd, str):
+        doc["release_date"] = _parse_release_date(rd) or rd
+    return doc
+
+
+def iter_games(games_json_path: Path) -> Iterator[dict]:
     """
-    Load games from JSON. Accepts either:
+    Yield games from JSON one document at a time. Accepts either:
       - an array of documents, or
-      - a {id: {...}, id2: {...}} map and converts to array with _id set.
+      - a {id: {...}, id2: {...}} map, yielded with _id set from the keys.
+    Files up to GAMES_JSON_INMEMORY_MAX_BYTES are parsed in one call,
+    larger ones are streamed with ijson.
     Also tries to parse release_date if it's a human-readable string.
     """
-    logger.info("[games] Loading JSON from %s", games_json_path)
+    size = games_json_path.stat().st_size
+
+    with games_json_path.open("rb") as f:
+        if size <= GAMES_JSON_INMEMORY_MAX_BYTES:
+            logger.info("[games] Loading JSON from %s (%d bytes)", games_json_path, size)
+            docs = _load_games_in_memory(f)
+        elif _json_top_level_is_array(f):
+            logger.info("[games] Streaming JSON array from %s", games_json_path)
+            docs = ijson.items(f, "item", use_float=True)
+        else:
+            logger.info("[games] Streaming JSON object from %s; using keys as _id", games_json_path)
+            docs = (
+                {**v, "_id": int(k) if str(k).isdigit() else k}
+                for k, v in ijson.kvitems(f, "", use_float=True)
+            )
 
-    with games_json_path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+        for doc in docs:
+            yield _normalize_game_doc(doc)
 
-    if isinstance(data, dict):
-        logger.debug("[games] JSON is object; converting to array with _id from keys")
-        data = [
-            {**v, "_id": int(k) if str(k).isdigit() else k}
-            for k, v in data.items()
-        ]
-    else:
-        logger.debug("[games] JSON is array; documents count: %d", len(data))
 
-    for i, doc in enumerate(data):
-        rd = doc.get("release_date")
-        if isinstance(rd, str):
-            parsed = parse_date_mdy_long(rd)
-            if parsed:
-                doc["release_date"] = parsed
-        if i < 3:
-            logger.debug("[games] Sample doc[%d] keys: %s", i, list(doc.keys()))
+def import_games(db, build_indexes: bool = False, build_text_index: bool = False):
+    """Importe les jeux depuis le games.json local (mode sans S3), en streaming."""
+    col = db[GAMES_COLLECTION]
+    if build_indexes:
+        _drop_secondary_indexes(col, "games")
+
+    ops = []
+    total_inserted = 0
+
+    for doc in iter_games(GAMES_JSON_PATH):
+        if "_id" in doc:
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": doc}, upsert=True))
+        else:
+            ops.append(InsertOne(doc))
+
+        if len(ops) >= BATCH_SIZE_GAMES:
+            col.bulk_write(ops, ordered=False)
+            total_inserted += len(ops)
+            logger.info(f"🎮 {total_inserted} jeux traités...")
+            ops = []
+
+    if ops:
+        col.bulk_write(ops, ordered=False)
+        total_inserted += len(ops)
 
-    logger.info("[games] Loaded %d game documents from JSON", len(data))
-    return data
+    logger.info(f"✅ Importation des jeux terminée : {total_inserted} documents.")
 
-def import_games_from_s3(db, build_indexes: bool = False):
+    if build_indexes:
+        _create_games_indexes(col, build_text_index)
+
+
+def _drop_secondary_indexes(col, tag: str) -> None:
+    """
+    Supprime les index hors _id avant un chargement qui les recréera : sinon
+    chaque insert paie la mise à jour de tous les B-trees.
+    """
+    logger.info("[%s] Suppression des index secondaires avant le chargement...", tag)
+    col.drop_indexes()  # l'index _id n'est jamais supprimé
+
+
+def _create_games_indexes(col, build_text_index: bool = False) -> None:
+    """Index des jeux, créés après le chargement ; l'index texte est coûteux et optionnel."""
+    logger.info("[games] Création des index...")
+    indexes = [IndexModel([("price", ASCENDING)], background=True)]
+    if build_text_index:
+        logger.info("[games] Création de l'index texte sur 'name'...")
+        indexes.append(IndexModel([("name", TEXT)], background=True))
+    col.create_indexes(indexes)
+
+
+def _create_reviews_indexes(col, build_text_index: bool = False) -> None:
+    """Index des reviews, créés en une fois après le chargement."""
+    logger.info("[reviews] Création des index...")
+    indexes = [
+        IndexModel([("app_id", ASCENDING), ("post_date", DESCENDING)], background=True),
+        IndexModel([("user", ASCENDING)], background=True),
+    ]
+    if build_text_index:
+        logger.info("[reviews] Création de l'index texte sur 'review_text'...")
+        indexes.append(IndexModel([("review_text", TEXT)], background=True))
+    col.create_indexes(indexes)
+
+
+def import_games_from_s3(db, build_indexes: bool = False, build_text_index: bool = False):
     """Importe les jeux en streaming direct depuis S3 vers MongoDB."""
-    s3 = boto3.client('s3')
+    s3 = _s3()
     col = db[GAMES_COLLECTION]
     
     logger.info(f"[games] Streaming de games.json depuis S3 (s3://{S3_BUCKET}/{S3_GAMES_KEY})...")
+    if build_indexes:
+        _drop_secondary_indexes(col, "games")
+    logger.debug("[games] ijson backend: %s", ijson.backend)
     
     try:
         response = s3.get_object(Bucket=S3_BUCKET, Key=S3_GAMES_KEY)
         # response['Body'] est un flux binaire que ijson peut lire petit à petit
         # On utilise kvitems car votre JSON est un dictionnaire { "id": {data} }
-        parser = ijson.kvitems(response['Body'], '')
+        # use_float=True : ijson produit directement des float (BSON ne sait pas
+        # encoder les Decimal). Les prix deviennent des doubles IEEE (19.99 n'est
+        # pas exact), comme avec json/orjson ; sans importance pour un tri/filtre.
+        parser = ijson.kvitems(response['Body'], '', use_float=True)
         
         batch = []
-        batch_size = 1000
         total_inserted = 0
         
         for k, v in parser:
             # Reconstitution du document avec son ID
             doc = {**v, "_id": int(k) if str(k).isdigit() else k}
 
-            # --- AJOUT DE LA CORRECTION ICI ---
-            # On convertit le prix de Decimal à float pour MongoDB
-            if "price" in doc and isinstance(doc["price"], Decimal):
-                doc["price"] = float(doc["price"])
-            # ----------------------------------
-            
-            # Parsing de la date (réutilisation de votre helper)
-            rd = doc.get("release_date")
-            if isinstance(rd, str):
-                parsed_dt = parse_date_mdy_long(rd)
-                if parsed_dt:
-                    doc["release_date"] = parsed_dt
-            
+            _normalize_game_doc(doc)
+
             # On utilise UpdateOne avec upsert pour éviter les doublons
             batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": doc}, upsert=True))
             
-            if len(batch) >= batch_size:
+            if len(batch) >= BATCH_SIZE_GAMES:
                 col.bulk_write(batch, ordered=False)
                 total_inserted += len(batch)
                 logger.info(f"🎮 {total_inserted} jeux traités...")
@@ -328,9 +588,7 @@ def import_games_from_s3(db, build_indexes: bool = False):
         logger.info(f"✅ Importation des jeux terminée : {total_inserted} documents.")
 
         if build_indexes:
-            logger.info("[games] Création des index...")
-            col.create_index([("name", "text")])
-            col.create_index([("price", 1)])
+            _create_games_indexes(col, build_text_index)
 
     except Exception as e:
         logger.error(f"❌ Erreur pendant le streaming S3 des jeux: {e}")
@@ -342,74 +600,802 @@ def import_games_from_s3(db, build_indexes: bool = False):
 
 from smart_open import open as smart_open
 
-def import_reviews(db, build_indexes: bool = False):
-    col = db[REVIEWS_COLLECTION]
-    col.drop()
-    
-    s3_url = f"s3://{S3_BUCKET}/{S3_REVIEWS_KEY}"
-    logger.info(f"[reviews] Streaming de TOUS les fichiers du ZIP S3...")
+def _reviews_zip_source() -> str:
+    """
+    Emplacement du ZIP des reviews : S3 si configuré, sinon l'URL Mendeley
+    en mode REVIEWS_STREAM_HTTP, sinon le téléchargement local.
+    """
+    if S3_BUCKET:
+        return f"s3://{S3_BUCKET}/{S3_REVIEWS_KEY}"
+    if REVIEWS_STREAM_HTTP:
+        return REVIEWS_ZIP_URL
+    return str(DATA_DIR / "reviews_download.zip")
 
-    total_inserted = 0
 
+# Fin du fichier gardée en mémoire par source (répertoire central du ZIP) :
+# chaque CSV rouvre le ZIP, on évite ainsi de refaire la requête à chaque fois.
+_ZIP_TAIL_CACHE: Dict[str, Tuple[int, int, bytes]] = {}
+
+
+class _RangeFile(io.RawIOBase):
+    """
+    Fichier distant en lecture seule, seekable, lu par requêtes Range.
+
+    zipfile n'a besoin que de seek()/read() : on peut donc lire le répertoire
+    central (en fin de fichier, mis en cache) puis uniquement les octets du CSV
+    importé, chaque tâche ayant ses propres requêtes. Le transport est fourni
+    au constructeur : object_size() et read_range(start, end) (bornes incluses),
+    voir _http_range_file / _s3_range_file.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        object_size: Callable[[], int],
+        read_range: Callable[[int, int], bytes],
+    ):
+        self.source = source
+        self._object_size = object_size
+        self._read_range = read_range
+        self._pos = 0
+        cached = _ZIP_TAIL_CACHE.get(source)
+        if cached is None:
+            cached = self._fetch_tail()
+            _ZIP_TAIL_CACHE[source] = cached
+        self._size, self._tail_start, self._tail = cached
+
+    def _fetch_tail(self) -> Tuple[int, int, bytes]:
+        size = self._object_size()
+        tail_start = max(0, size - ZIP_TAIL_CACHE_BYTES)
+        tail = self._read_range(tail_start, size - 1)
+        logger.info("[reviews] ZIP distant : %d octets, %d octets de fin en cache", size, len(tail))
+        return size, tail_start, tail
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, b) -> int:
+        if self._pos >= self._size:
+            return 0
+        end = min(self._pos + len(b), self._size)
+        if self._pos >= self._tail_start:
+            data = self._tail[self._pos - self._tail_start:end - self._tail_start]
+        else:
+            data = self._read_range(self._pos, end - 1)
+        n = len(data)
+        b[:n] = data
+        self._pos += n
+        return n
+
+
+def _http_range_file(url: str, session: Optional[requests.Session] = None) -> _RangeFile:
+    """ZIP lu sur une URL HTTP(S) par en-têtes Range (mode REVIEWS_STREAM_HTTP)."""
+    session = session or _http_session()
+
+    def get(start: int, end: int) -> requests.Response:
+        r = session.get(url, headers={"Range": f"bytes={start}-{end}"}, timeout=(10, 120))
+        r.raise_for_status()
+        if r.status_code != 206:
+            raise IOError(f"Le serveur ignore les requêtes Range pour {url}")
+        return r
+
+    return _RangeFile(
+        url,
+        object_size=lambda: int(get(0, 0).headers["Content-Range"].rsplit("/", 1)[1]),
+        read_range=lambda start, end: get(start, end).content,
+    )
+
+
+def _s3_range_file(s3_url: str) -> _RangeFile:
+    """ZIP lu sur S3 par GetObject avec Range (le client S3 du module est thread-safe)."""
+    bucket, key = s3_url[len("s3://"):].split("/", 1)
+
+    def read_range(start: int, end: int) -> bytes:
+        resp = _s3().get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}")
+        return resp["Body"].read()
+
+    return _RangeFile(
+        s3_url,
+        object_size=lambda: _s3().head_object(Bucket=bucket, Key=key)["ContentLength"],
+        read_range=read_range,
+    )
+
+
+def _open_reviews_zip(zip_source: str):
+    """
+    Ouvre le ZIP des reviews en binaire : requêtes Range pour S3 ou une URL
+    (répertoire central lu une seule fois par processus, puis un GET de 4MB
+    par bloc du CSV lu), fichier local sinon.
+    """
+    if zip_source.startswith("s3://"):
+        return io.BufferedReader(_s3_range_file(zip_source), buffer_size=DOWNLOAD_BUFFER_SIZE)
+    if zip_source.startswith(("http://", "https://")):
+        return io.BufferedReader(_http_range_file(zip_source), buffer_size=DOWNLOAD_BUFFER_SIZE)
+    return smart_open(zip_source, 'rb')
+
+
+def _csv_app_id(csv_filename: str) -> int:
+    """
+    Extrait l'app_id depuis le nom du CSV :
+      "Game Reviews/1000000_37.csv" -> 1000000
+    """
     try:
-        with smart_open(s3_url, 'rb') as s3_stream:
-            with zipfile.ZipFile(s3_stream) as z:
-                # 1. On récupère la liste de TOUS les CSV
-                csv_files = [f for f in z.namelist() if f.endswith('.csv')]
-                
-                batch = []
-                # 2. BOUCLE SUR CHAQUE FICHIER (Indispensable !)
-                for csv_filename in csv_files:
-                    
-                    # 3. EXTRACTION DE L'APP_ID DEPUIS LE NOM (Logique locale)
-                    # "Game Reviews/1000000_37.csv" -> "1000000"
-                    try:
-                        pure_name = csv_filename.split('/')[-1] # Enlever le dossier
-                        file_app_id = int(pure_name.split('_')[0])
-                    except:
-                        file_app_id = 0
-
-                    with z.open(csv_filename) as f:
-                        reader = csv.DictReader(io.TextIOWrapper(f, encoding='utf-8'))
-                        
-                        for row in reader:
-                            user = (row.get("user") or row.get("author_steamid") or "").strip()
-                            review_text = (row.get("review") or row.get("review_text") or "").strip()
-                            
-                            if not user or not review_text:
-                                continue
-
-                            doc = {
-                                "app_id": file_app_id, # On utilise l'ID extrait du nom
-                                "user": user,
-                                "playtime": float(row.get("playtime") or row.get("author_playtime_forever") or 0),
-                                "review_text": review_text,
-                                "recommend": row.get("recommend") == "Recommended" or row.get("recommended") == "True",
-                                "source_file": csv_filename
-                            }
+        pure_name = csv_filename.split('/')[-1]  # Enlever le dossier
+        return int(pure_name.split('_')[0])
+    except ValueError:
+        return 0
+
+
+def _column_index(header: List[str], *names: str) -> Optional[int]:
+    """Index de la première colonne présente parmi `names`, ou None."""
+    for name in names:
+        if name in header:
+            return header.index(name)
+    return None
+
+
+def _insert_reviews_batch(col, batch: List[dict]) -> int:
+    """
+    Insère un lot de reviews (dicts bruts) et retourne le nombre réellement inséré.
+    Avec ordered=False, une erreur sur un document n'arrête pas le reste du lot.
+    En écriture non acquittée (w=0), c'est le nombre de documents envoyés.
+    """
+    try:
+        if col.write_concern.acknowledged:
+            col.insert_many(batch, ordered=False, bypass_document_validation=True)
+        else:
+            # PyMongo refuse bypass_document_validation avec w=0
+            col.insert_many(batch, ordered=False)
+        return len(batch)
+    except BulkWriteError as e:
+        n_inserted = e.details.get("nInserted", 0)
+        errors = e.details.get("writeErrors", [])
+        # Clé dupliquée (11000) : review déjà importée, c'est attendu à la reprise
+        n_other = sum(1 for err in errors if err.get("code") != 11000)
+        if n_other:
+            logger.warning(
+                "[reviews] Lot partiellement inséré : %d/%d (%d erreurs hors doublons)",
+                n_inserted,
+                len(batch),
+                n_other,
+            )
+        else:
+            logger.debug("[reviews] %d reviews déjà présentes ignorées", len(errors))
+        return n_inserted
+
+
+def _effective_review_batch_size(sample: List[dict], csv_filename: str) -> int:
+    """
+    Taille de lot pour un fichier, réduite si les documents échantillonnés sont gros.
+    """
+    avg_doc_size = sum(len(bson.encode(doc)) for doc in sample) / len(sample)
+    batch_size = min(BATCH_SIZE_REVIEWS, max(1, int(REVIEW_BATCH_MAX_BYTES // avg_doc_size)))
+    logger.info(
+        "[reviews] %s : lots de %d documents (~%.0f octets/doc)",
+        csv_filename,
+        batch_size,
+        avg_doc_size,
+    )
+    return batch_size
+
+
+def _csv_reader_for_member(f, info: zipfile.ZipInfo):
+    """
+    csv.reader sur un membre du ZIP.
+
+    Les petits CSV (la grande majorité) sont décompressés et décodés en une
+    fois ; les gros sont décodés par blocs de 1MB pour rester en mémoire bornée.
+    """
+    if info.file_size <= REVIEW_CSV_INMEMORY_MAX_BYTES:
+        text = f.read().decode('utf-8', 'replace')
+        return csv.reader(io.StringIO(text, newline=''))
+
+    return csv.reader(_iter_member_lines(f))
+
+
+def _iter_member_lines(f, chunk_size: int = 1 << 20) -> Iterator[str]:
+    """
+    Lignes décodées d'un membre du ZIP, sans TextIOWrapper par-dessus le
+    tampon de zipfile : chaque bloc est décodé d'un coup puis découpé sur '\n'.
+
+    On ne découpe pas les octets bruts sur b',' : les reviews contiennent des
+    virgules et des retours à la ligne entre guillemets, que seul csv.reader
+    sait recoller (d'où des lignes complètes, '\n' conservé).
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')('replace')
+    rest = ''
+    while True:
+        chunk = f.read(chunk_size)
+        text = rest + decoder.decode(chunk, final=not chunk)
+        lines = text.split('\n')
+        rest = lines.pop()
+        for line in lines:
+            yield line + '\n'
+        if not chunk:
+            break
+    if rest:
+        yield rest
+
+
+def _clean_header(header: List[str]) -> List[str]:
+    return [h.strip().lstrip('\ufeff') for h in header]
+
 
-                            batch.append(InsertOne(doc))
+def _resolve_review_columns(
+    header: List[str], csv_filename: str
+) -> Optional[Tuple[Dict[str, Optional[int]], str]]:
+    """
+    Le schéma varie selon les fichiers : résout une fois les index de colonnes.
+    Retourne (index des colonnes, valeur "vraie" de la colonne recommend),
+    ou None (fichier ignoré) si user ou review est absent.
 
-                            if len(batch) >= 5000:
-                                col.bulk_write(batch, ordered=False)
-                                total_inserted += len(batch)
-                                batch = []
+    Selon le schéma, l'avis est dans "recommend" ("Recommended") ou dans
+    "recommended" ("True") : une seule colonne et une seule comparaison par ligne.
+    """
+    recommend_idx = _column_index(header, "recommend")
+    recommend_true = "Recommended"
+    if recommend_idx is None:
+        recommend_idx = _column_index(header, "recommended")
+        recommend_true = "True"
+
+    cols = {
+        "user": _column_index(header, "user", "author_steamid"),
+        "review": _column_index(header, "review", "review_text"),
+        "playtime": _column_index(header, "playtime", "author_playtime_forever"),
+        "recommend": recommend_idx,
+        "post_date": _column_index(header, "post_date"),
+        "early": _column_index(header, "early_access_review"),
+    }
+    if cols["user"] is None or cols["review"] is None:
+        logger.warning("[reviews] %s : colonnes user/review absentes, fichier ignoré", csv_filename)
+        return None
+    return cols, recommend_true
 
-                if batch:
-                    col.bulk_write(batch, ordered=False)
-                    total_inserted += len(batch)
+
+def _csv_member_docs(f, info: zipfile.ZipInfo, app_id: int) -> Iterator[dict]:
+    """Documents d'un membre CSV, parsé ligne à ligne par le module csv."""
+    csv_filename = info.filename
+    reader = _csv_reader_for_member(f, info)
+    resolved = _resolve_review_columns(_clean_header(next(reader, [])), csv_filename)
+    if resolved is None:
+        return
+    cols, recommend_true = resolved
+
+    idx_user = cols["user"]
+    idx_review = cols["review"]
+    idx_playtime = cols["playtime"]
+    idx_recommend = cols["recommend"]
+    idx_post_date = cols["post_date"]
+    idx_early = cols["early"]
+    min_len = 1 + max(i for i in cols.values() if i is not None)
+
+    if None not in cols.values():
+        # Schéma complet (user, playtime, post_date, recommend, early_access) : boucle spécialisée
+        yield from _csv_full_schema_docs(reader, cols, recommend_true, min_len, app_id, csv_filename)
+        return
+
+    for row in reader:
+        if len(row) < min_len:
+            continue
+
+        user = row[idx_user].strip()
+        review_text = row[idx_review].strip()
+
+        if not user or not review_text:
+            continue
+
+        doc = {
+            "_id": f"{app_id}:{user}",  # une review par (jeu, user) : réimport idempotent
+            "app_id": app_id, # On utilise l'ID extrait du nom
+            "user": user,
+            "playtime": float(row[idx_playtime] or 0) if idx_playtime is not None else 0.0,
+            "review_text": review_text,
+            "recommend": idx_recommend is not None and row[idx_recommend] == recommend_true,
+            # Toujours écrit (False si absent) : l'API filtre sur early_access=false
+            "early_access": idx_early is not None and coerce_bool_early_access(row[idx_early]),
+            "source_file": csv_filename
+        }
+        # Champ optionnel : ajouté seulement s'il a une valeur
+        if idx_post_date is not None:
+            post_date = parse_date_mdy_long(row[idx_post_date])
+            if post_date is not None:
+                doc["post_date"] = post_date
+
+        yield doc
+
+
+def _csv_full_schema_docs(
+    reader, cols: Dict[str, int], recommend_true: str, min_len: int, app_id: int, csv_filename: str
+) -> Iterator[dict]:
+    """
+    Boucle de _csv_member_docs spécialisée pour les fichiers où toutes les
+    colonnes sont présentes (le cas du dataset Mendeley) : aucun test
+    "colonne absente ?" par ligne.
+    """
+    idx_user = cols["user"]
+    idx_review = cols["review"]
+    idx_playtime = cols["playtime"]
+    idx_recommend = cols["recommend"]
+    idx_post_date = cols["post_date"]
+    idx_early = cols["early"]
+
+    for row in reader:
+        if len(row) < min_len:
+            continue
+
+        user = row[idx_user].strip()
+        review_text = row[idx_review].strip()
+
+        if not user or not review_text:
+            continue
+
+        doc = {
+            "_id": f"{app_id}:{user}",
+            "app_id": app_id,
+            "user": user,
+            "playtime": float(row[idx_playtime] or 0),
+            "review_text": review_text,
+            "recommend": row[idx_recommend] == recommend_true,
+            "early_access": coerce_bool_early_access(row[idx_early]),
+            "source_file": csv_filename
+        }
+        post_date = parse_date_mdy_long(row[idx_post_date])
+        if post_date is not None:
+            doc["post_date"] = post_date
+
+        yield doc
+
+
+def _arrow_parse_dates(values):
+    """Équivalent vectorisé de parse_date_mdy_long (chaînes -> timestamp, null si invalide)."""
+    values = pc.utf8_trim_whitespace(values)
+    # "Sept 3, 2015" : %b n'accepte que "Sep", comme l'alias "sept" de _MONTHS
+    values = pc.replace_substring_regex(values, pattern=r"^(?i)sept\b", replacement="Sep")
+    return pc.coalesce(
+        pc.strptime(pc.utf8_slice_codeunits(values, 0, 10), format="%Y-%m-%d", unit="s", error_is_null=True),
+        pc.strptime(values, format="%B %d, %Y", unit="s", error_is_null=True),
+        pc.strptime(values, format="%b %d, %Y", unit="s", error_is_null=True),
+    )
+
+
+def _arrow_member_docs(f, info: zipfile.ZipInfo, app_id: int) -> Iterator[dict]:
+    """
+    Documents d'un membre CSV parsé par pyarrow (C++), par blocs de 4MB.
+
+    Toutes les colonnes sont lues en chaînes, puis nettoyage, filtrage et
+    conversions (playtime, recommend, post_date, early_access) sont faits
+    colonne par colonne avec pyarrow.compute : il ne reste en Python que
+    l'assemblage des dicts.
+    """
+    csv_filename = info.filename
+    raw_header = next(csv.reader([f.readline().decode('utf-8-sig', 'replace')]), [])
+    resolved = _resolve_review_columns(_clean_header(raw_header), csv_filename)
+    if resolved is None:
+        return
+    cols, recommend_true = resolved
+    f.seek(0)
+
+    reader = pacsv.open_csv(
+        f,
+        read_options=pacsv.ReadOptions(block_size=1 << 22),
+        parse_options=pacsv.ParseOptions(
+            newlines_in_values=True,  # les reviews contiennent des retours à la ligne
+            invalid_row_handler=lambda row: "skip",
+        ),
+        convert_options=pacsv.ConvertOptions(
+            column_types={name: pa.string() for name in raw_header},
+        ),
+    )
+
+    for record_batch in reader:
+        users = pc.utf8_trim_whitespace(record_batch.column(cols["user"]))
+        reviews = pc.utf8_trim_whitespace(record_batch.column(cols["review"]))
+        keep = pc.and_(pc.greater(pc.utf8_length(users), 0), pc.greater(pc.utf8_length(reviews), 0))
+
+        n_rows = record_batch.num_rows
+        if cols["playtime"] is not None:
+            raw = record_batch.column(cols["playtime"])
+            playtime = pc.cast(pc.if_else(pc.equal(raw, ""), "0", raw), pa.float64())
+        else:
+            playtime = pa.repeat(0.0, n_rows)
+
+        if cols["recommend"] is not None:
+            recommend = pc.fill_null(pc.equal(record_batch.column(cols["recommend"]), recommend_true), False)
+        else:
+            recommend = pa.repeat(False, n_rows)
+
+        if cols["post_date"] is not None:
+            post_dates = _arrow_parse_dates(record_batch.column(cols["post_date"]))
+        else:
+            post_dates = pa.nulls(n_rows, pa.timestamp("s"))
+
+        if cols["early"] is not None:
+            early = pc.equal(
+                pc.utf8_lower(pc.utf8_trim_whitespace(record_batch.column(cols["early"]))),
+                "early access review",
+            ).fill_null(False)  # cellule vide -> False, comme coerce_bool_early_access
+        else:
+            early = pa.repeat(False, n_rows)
+
+        columns = [
+            pc.filter(arr, keep).to_pylist()
+            for arr in (users, reviews, playtime, recommend, post_dates, early)
+        ]
+        for user, review_text, pt, rec, post_date, early_v in zip(*columns):
+            doc = {
+                "_id": f"{app_id}:{user}",
+                "app_id": app_id,
+                "user": user,
+                "playtime": pt,
+                "review_text": review_text,
+                "recommend": rec,
+                "early_access": early_v,
+                "source_file": csv_filename,
+            }
+            if post_date is not None:
+                doc["post_date"] = post_date
+            yield doc
+
+
+def _parse_csv_to_batches(zip_source: str, csv_filename: str, app_id: int) -> Iterator[List[dict]]:
+    """
+    Parse un CSV du ZIP des reviews et produit des lots de documents prêts à insérer.
+
+    Fonction de niveau module (picklable) : utilisée telle quelle par les
+    threads comme par les processus de l'import.
+    Le parsing passe par pyarrow s'il est installé ; si pyarrow rejette le
+    fichier avant le premier lot, on le relit avec le module csv.
+    """
+    use_arrow = pacsv is not None
+    yielded = False
+    try:
+        for batch in _iter_csv_batches(zip_source, csv_filename, app_id, use_arrow):
+            yielded = True
+            yield batch
+    except _ArrowInvalid as e:
+        if yielded:
+            raise
+        logger.warning("[reviews] %s : échec pyarrow (%s), repli sur le module csv", csv_filename, e)
+        yield from _iter_csv_batches(zip_source, csv_filename, app_id, use_arrow=False)
+
+
+def _iter_csv_batches(
+    zip_source: str, csv_filename: str, app_id: int, use_arrow: bool
+) -> Iterator[List[dict]]:
+    """
+    Corps de _parse_csv_to_batches.
+
+    ZipFile n'est pas thread-safe pour des .open() concurrents sur la même
+    instance : chaque appel ouvre donc son propre handle sur le ZIP.
+    """
+    batch = []
+    batch_size = BATCH_SIZE_REVIEWS
+    batch_sized = False
+    member_docs = _arrow_member_docs if use_arrow else _csv_member_docs
+
+    with _open_reviews_zip(zip_source) as stream, zipfile.ZipFile(stream) as z:
+        info = z.getinfo(csv_filename)
+        with z.open(info) as f:
+            for doc in member_docs(f, info, app_id):
+                batch.append(doc)
+
+                if not batch_sized and len(batch) == _BATCH_SIZE_SAMPLE:
+                    batch_size = _effective_review_batch_size(batch, csv_filename)
+                    batch_sized = True
+
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+
+    if batch:
+        yield batch
+
+
+class _ReviewsWriter:
+    """
+    Pool de threads d'écriture partagé par les tâches de parsing.
+
+    Un thread de parsing ne bloque plus sur le round-trip Mongo de chaque lot :
+    il confie le lot au pool et continue de parser. Au plus `max_pending` lots
+    sont en attente à la fois (contre-pression), la mémoire reste donc bornée.
+    """
+
+    def __init__(self, col, workers: int, max_pending: int):
+        self._col = col
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reviews-writer")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, batch: List[dict]) -> Future:
+        self._slots.acquire()
+        try:
+            fut = self._executor.submit(_insert_reviews_batch, self._col, batch)
+        except BaseException:
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        return fut
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._executor.shutdown(wait=True)
+
+
+def _stamp_batches(batches: Iterator[List[dict]], ingested_at: datetime) -> Iterator[List[dict]]:
+    """Ajoute _ingested_at (date de l'import) aux reviews, pour le build incrémental des users."""
+    for batch in batches:
+        for doc in batch:
+            doc["_ingested_at"] = ingested_at
+        yield batch
+
+
+def _import_one_csv(
+    col,
+    ingested_at: datetime,
+    app_id: int,
+    zip_source: str,
+    csv_filename: str,
+    writer: Optional[_ReviewsWriter] = None,
+    collect_users: bool = False,
+) -> Tuple[int, Optional[set]]:
+    """
+    Importe un seul CSV du ZIP des reviews.
+    Retourne le nombre de documents insérés et, avec collect_users, l'ensemble
+    des users du fichier (pour construire 'users' sans relire les reviews).
+    Avec un `writer`, les lots sont insérés par son pool pendant que le parsing continue.
+    """
+    total_inserted = 0
+    users = set() if collect_users else None
+    batches = _stamp_batches(_parse_csv_to_batches(zip_source, csv_filename, app_id), ingested_at)
+    if users is not None:
+        batches = _collect_batch_users(batches, users)
+    if writer is None:
+        for batch in batches:
+            total_inserted += _insert_reviews_batch(col, batch)
+    else:
+        pending = [writer.submit(batch) for batch in batches]
+        # On attend ses propres lots : le fichier n'est marqué fait qu'une fois tout inséré
+        total_inserted = sum(fut.result() for fut in pending)
+
+    logger.debug("[reviews] %s -> %d documents", csv_filename, total_inserted)
+    return total_inserted, users
+
+
+def _collect_batch_users(batches: Iterator[List[dict]], users: set) -> Iterator[List[dict]]:
+    for batch in batches:
+        users.update(doc["user"] for doc in batch)
+        yield batch
+
+
+def _reviews_write_concern(acknowledged: bool) -> WriteConcern:
+    """Write concern du chargement initial : w=0, ou w=1 sans journal (j=False) si acquitté."""
+    if acknowledged:
+        return WriteConcern(w=1, j=False)
+    return WriteConcern(w=0)
+
+
+def _import_one_csv_in_process(
+    env: Dict[str, str],
+    acknowledged: bool,
+    ingested_at: datetime,
+    collect_users: bool,
+    app_id: int,
+    zip_source: str,
+    csv_filename: str,
+) -> Tuple[int, Optional[set]]:
+    """
+    Variante de _import_one_csv exécutée dans un processus du pool : le parsing
+    CSV (CPU) y échappe au GIL, et l'insertion se fait avec le MongoClient
+    propre au processus (cache par PID de get_db_from_env).
+    """
+    col = get_db_from_env(env, max_pool_size=10)[REVIEWS_COLLECTION]
+    col = col.with_options(write_concern=_reviews_write_concern(acknowledged))
+    return _import_one_csv(col, ingested_at, app_id, zip_source, csv_filename, collect_users=collect_users)
+
+
+def _load_reviews_checkpoint(path: Path) -> set:
+    """Noms des CSV déjà importés entièrement (une ligne JSON par fichier)."""
+    done = set()
+    if not path.exists():
+        return done
+    with path.open("r", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                done.add(json.loads(line)["file"])
+            except (ValueError, KeyError):
+                # Dernière ligne tronquée par un crash : le fichier sera réimporté
+                logger.warning("[reviews] Ligne de checkpoint invalide ignorée : %r", line)
+    return done
+
+
+def _start_reviews_checkpoint(path: Path) -> None:
+    """Crée le checkpoint (vide s'il n'existe pas), synchronisé sur disque."""
+    with path.open("a", encoding="utf-8") as fh:
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+def _mark_csv_done(path: Path, csv_filename: str, app_id: int) -> None:
+    """Ajoute un CSV terminé au checkpoint, synchronisé sur disque."""
+    with path.open("a", encoding="utf-8") as fh:
+        fh.write(json.dumps({"file": csv_filename, "app_id": app_id}) + "\n")
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+def import_reviews(
+    db,
+    build_indexes: bool = False,
+    workers: int = 1,
+    acknowledged: bool = True,
+    processes: int = 0,
+    env: Optional[Dict[str, str]] = None,
+    collect_users: bool = False,
+    build_text_index: bool = False,
+) -> Optional[Dict[str, set]]:
+    """
+    Importe tous les CSV du ZIP des reviews, un fichier par tâche.
+
+    L'import est limité par la latence réseau/Mongo : avec `workers` threads,
+    les bulk_write de plusieurs fichiers se chevauchent.
+
+    Par défaut chaque lot est acquitté par le primaire seul (w=1, sans
+    attendre le journal) : un lot est appliqué avant que son CSV soit noté
+    dans le checkpoint, et avant que les étapes suivantes (index, users)
+    relisent les reviews.
+    Avec acknowledged=False (w=0), le client n'attend plus la réponse du
+    serveur : plus rapide, mais les erreurs passent inaperçues et rien ne
+    garantit que les inserts sont appliqués quand l'import rend la main.
+
+    Avec processes > 0, les CSV sont traités par un pool de processus (quand
+    le parsing, et non Mongo, devient le goulot) ; chaque processus recrée sa
+    connexion à partir de `env`.
+
+    Chaque CSV terminé est noté dans REVIEWS_CHECKPOINT_PATH : après un crash,
+    l'import reprend là où il s'était arrêté au lieu de tout recharger.
+
+    La collection n'est jamais vidée : chaque review a un _id déterministe
+    "<app_id>:<user>", les documents déjà présents sont rejetés par le serveur
+    (clé dupliquée) et seules les nouvelles reviews sont ajoutées.
+
+    Avec collect_users=True, retourne {user: {app_id, ...}} accumulé pendant
+    l'import (voir write_users_from_import), ou None si ce n'est pas fiable :
+    reprise d'un import (fichiers des runs précédents non vus) ou fichier en erreur.
+
+    Avec build_indexes, les index secondaires sont supprimés avant le
+    chargement et recréés ensuite (plus l'index texte sur review_text si
+    build_text_index) ; sans, les index existants sont laissés en place.
+    """
+    base_col = db[REVIEWS_COLLECTION]
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+
+    done = _load_reviews_checkpoint(REVIEWS_CHECKPOINT_PATH)
+    # Checkpoint créé avant le premier insert : un crash pendant le premier CSV
+    # laisse quand même une trace, et main() reprendra l'import au prochain run
+    _start_reviews_checkpoint(REVIEWS_CHECKPOINT_PATH)
+    if done:
+        # Les fichiers interrompus ont pu être insérés en partie : les _id
+        # déterministes font que leurs reviews déjà présentes sont ignorées
+        logger.info("[reviews] Reprise : %d fichiers déjà importés d'après le checkpoint", len(done))
+    if build_indexes:
+        _drop_secondary_indexes(base_col, "reviews")
+
+    # Write concern propre au chargement ; base_col (index, etc.) garde celui par défaut
+    col = base_col.with_options(write_concern=_reviews_write_concern(acknowledged))
+
+    zip_source = _reviews_zip_source()
+    ingested_at = datetime.now(timezone.utc)
+    workers = max(1, workers)
+    if processes > 0 and env is None:
+        raise ValueError("import_reviews: env is required when processes > 0")
+    logger.info(f"[reviews] Streaming de TOUS les fichiers du ZIP ({zip_source})...")
+
+    total_inserted = 0
+    failed = 0
+    user_apps: Dict[str, set] = defaultdict(set)
+
+    try:
+        # 1. On récupère la liste de TOUS les CSV (lecture du répertoire central uniquement)
+        with _open_reviews_zip(zip_source) as stream, zipfile.ZipFile(stream) as z:
+            csv_infos = [info for info in z.infolist() if info.filename.endswith('.csv')]
+
+        tasks = [
+            (_csv_app_id(info.filename), info)
+            for info in csv_infos
+            if info.filename not in done
+        ]
+        logger.info(
+            "[reviews] %d fichiers CSV à importer (%d déjà faits) avec %d %s",
+            len(tasks),
+            len(csv_infos) - len(tasks),
+            processes if processes > 0 else workers,
+            "processus" if processes > 0 else "thread(s)",
+        )
+
+        # 2. Un fichier par tâche : threads (écritures Mongo qui se chevauchent)
+        #    ou processus (parsing CSV en parallèle, hors GIL)
+        #    Avec les threads, les inserts passent par un pool d'écriture
+        #    borné (workers * 2 lots en attente) pour chevaucher parsing et RTT.
+        if processes > 0:
+            executor = ProcessPoolExecutor(max_workers=processes)
+            writer = nullcontext()
+            task_fn, task_args = _import_one_csv_in_process, (env, acknowledged, ingested_at, collect_users)
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers)
+            writer = _ReviewsWriter(col, workers=workers, max_pending=workers * 2)
+            task_fn = partial(_import_one_csv, writer=writer, collect_users=collect_users)
+            task_args = (col, ingested_at)
+
+        with writer, executor:
+            futures = {
+                executor.submit(task_fn, *task_args, app_id, zip_source, info.filename): (
+                    app_id,
+                    info.filename,
+                )
+                for app_id, info in tasks
+            }
+            for fut in as_completed(futures):
+                app_id, csv_filename = futures[fut]
+                try:
+                    n_inserted, file_users = fut.result()
+                    total_inserted += n_inserted
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"❌ Erreur sur {csv_filename} : {e}")
+                    continue
+                _mark_csv_done(REVIEWS_CHECKPOINT_PATH, csv_filename, app_id)
+                if file_users is not None:
+                    for user in file_users:
+                        user_apps[user].add(app_id)
 
         logger.info(f"✅ Terminé : {total_inserted} documents importés.")
 
+        if failed:
+            logger.warning(
+                "[reviews] %d fichier(s) en erreur, checkpoint conservé pour la prochaine reprise",
+                failed,
+            )
+        else:
+            REVIEWS_CHECKPOINT_PATH.unlink(missing_ok=True)
+
+        # Index secondaires créés une fois le chargement terminé
+        if build_indexes:
+            _create_reviews_indexes(base_col, build_text_index)
+
+        if collect_users and not done and not failed:
+            return user_apps
+
     except Exception as e:
         logger.error(f"❌ Erreur : {e}")
+    return None
+
+
 # ---------------------------------------------------------------------------
 # Users build (from reviews)
 # ---------------------------------------------------------------------------
 
-def build_users_from_reviews(db, build_indexes: bool = False):
+def build_users_from_reviews(db, build_indexes: bool = False, already_present: bool = True):
     """
-    Build 'users' collection from 'reviews' using aggregation with $merge.
+    Build 'users' collection from 'reviews' using aggregation with $merge
+    ($out when the users collection is empty).
 
     Each user document:
       {
@@ -424,9 +1410,24 @@ def build_users_from_reviews(db, build_indexes: bool = False):
     to be happy.
 
     Any additional user indexes respect the build_indexes flag.
+
+    already_present tells whether 'users' already exists (the caller has
+    listed collections once); only a missing collection is rebuilt with $out,
+    which would otherwise drop users created through the API.
+
+    Incremental runs: the time of the last build is stored in META_COLLECTION.
+    When 'users' exists and a marker is found, only reviews with a more recent
+    _ingested_at are grouped, and their app ids / counts are merged into the
+    existing users ($setUnion / $add) instead of replacing them.
     """
     reviews_col = db[REVIEWS_COLLECTION]
     users_col = db[USERS_COLLECTION]
+    meta_col = db[META_COLLECTION]
+
+    # Pris avant l'agrégation : une review insérée pendant le build sera reprise au prochain
+    build_started_at = datetime.now(timezone.utc)
+    marker = meta_col.find_one({"_id": "users_build"}) if already_present else None
+    last_ingested_at = marker.get("last_ingested_at") if marker else None
 
     logger.info(
         "[users] Building users from '%s' into '%s' (merge on _id)...",
@@ -434,12 +1435,13 @@ def build_users_from_reviews(db, build_indexes: bool = False):
         USERS_COLLECTION,
     )
 
-    prev_count = users_col.estimated_document_count()
-    logger.debug("[users] Existing user doc count before build: %d", prev_count)
+    match = {"user": {"$ne": None}}  # Ignore reviews without a user
+    if last_ingested_at is not None:
+        logger.info("[users] Incremental build: reviews ingested after %s", last_ingested_at)
+        match["_ingested_at"] = {"$gt": last_ingested_at}
 
     pipeline = [
-        # Ignore reviews without a user
-        {"$match": {"user": {"$ne": None}}},
+        {"$match": match},
 
         # Group by username
         {
@@ -460,35 +1462,145 @@ def build_users_from_reviews(db, build_indexes: bool = False):
             }
         },
 
+    ]
+
+    if not already_present:
+        # Full rebuild: $out writes a temp collection and renames it atomically,
+        # cheaper than a per-document match/replace in the target.
+        pipeline.append({"$out": USERS_COLLECTION})
+    elif last_ingested_at is None:
         # Merge into 'users' on _id (default when 'on' is omitted)
-        {
-            "$merge": {
-                "into": USERS_COLLECTION,
-                # 'on' omitted -> defaults to "_id"
-                "whenMatched": "replace",
-                "whenNotMatched": "insert",
+        pipeline.append(
+            {
+                "$merge": {
+                    "into": USERS_COLLECTION,
+                    # 'on' omitted -> defaults to "_id"
+                    "whenMatched": "replace",
+                    "whenNotMatched": "insert",
+                }
             }
-        },
-    ]
+        )
+    else:
+        # Only new reviews were grouped: add them to the existing users
+        pipeline.append(
+            {
+                "$merge": {
+                    "into": USERS_COLLECTION,
+                    "whenMatched": [
+                        {
+                            "$set": {
+                                "owned_app_ids": {
+                                    "$setUnion": [{"$ifNull": ["$owned_app_ids", []]}, "$$new.owned_app_ids"]
+                                },
+                                "review_count": {
+                                    "$add": [{"$ifNull": ["$review_count", 0]}, "$$new.review_count"]
+                                },
+                            }
+                        }
+                    ],
+                    "whenNotMatched": "insert",
+                }
+            }
+        )
 
     logger.debug("[users] Aggregation pipeline: %r", pipeline)
 
-    # Force pipeline execution
-    list(reviews_col.aggregate(pipeline))
+    # Force pipeline execution; $group over all reviews exceeds the 100MB
+    # in-memory stage limit, so let it spill to disk explicitly.
+    list(reviews_col.aggregate(pipeline, allowDiskUse=True, batchSize=10000))
     logger.info("[users] Aggregation + merge completed.")
+    _mark_users_build(meta_col, build_started_at)
 
-    new_count = users_col.estimated_document_count()
-    logger.info(
-        "[users] Users collection doc count after build: %d (delta=%d)",
-        new_count,
-        new_count - prev_count,
+    # Compte pour le debug seulement : évite un round-trip juste après le $merge
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "[users] Users collection doc count after build: %d",
+            users_col.estimated_document_count(),
+        )
+    _create_users_indexes(users_col, build_indexes)
+
+
+def _mark_users_build(meta_col, built_at: datetime) -> None:
+    """Records when 'users' was last built (marker for the incremental build)."""
+    meta_col.update_one({"_id": "users_build"}, {"$set": {"last_ingested_at": built_at}}, upsert=True)
+
+
+def write_users_from_import(
+    db, user_apps: Dict[str, set], build_indexes: bool = False, already_present: bool = True
+) -> None:
+    """
+    Write 'users' from the {user: {app_id, ...}} map accumulated by
+    import_reviews(collect_users=True), without re-reading the reviews.
+
+    Same documents as build_users_from_reviews (one review per (app, user),
+    so review_count is the number of apps). A missing collection is filled
+    with plain insert_many batches; an existing one gets upserts that add the
+    new apps to each user ($addToSet / $inc).
+    """
+    users_col = db[USERS_COLLECTION]
+    built_at = datetime.now(timezone.utc)
+    logger.info("[users] Writing %d users collected during the reviews import...", len(user_apps))
+
+    batch = []
+    total = 0
+    for user, apps in user_apps.items():
+        if not already_present:
+            batch.append({"_id": user, "name": user, "owned_app_ids": list(apps), "review_count": len(apps)})
+        else:
+            batch.append(_user_upsert(user, apps))
+        if len(batch) >= BATCH_SIZE_USERS:
+            total += _write_users_batch(users_col, batch, already_present)
+            batch = []
+    if batch:
+        total += _write_users_batch(users_col, batch, already_present)
+
+    logger.info("[users] %d users written.", total)
+    _mark_users_build(db[META_COLLECTION], built_at)
+    _create_users_indexes(users_col, build_indexes)
+
+
+def _user_upsert(user: str, apps) -> UpdateOne:
+    """Upsert adding apps to a user ($addToSet / $inc), creating it if missing."""
+    return UpdateOne(
+        {"_id": user},
+        {
+            "$setOnInsert": {"name": user},
+            "$addToSet": {"owned_app_ids": {"$each": list(apps)}},
+            "$inc": {"review_count": len(apps)},
+        },
+        upsert=True,
     )
 
+
+def _write_users_batch(users_col, batch: list, already_present: bool) -> int:
+    if already_present:
+        users_col.bulk_write(batch, ordered=False)
+        return len(batch)
+    try:
+        users_col.insert_many(batch, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        # Clé dupliquée (11000) : user créé entre-temps (ex. par l'API), on lui
+        # ajoute ses apps par upsert au lieu de faire échouer l'import
+        duplicates = [batch[err["index"]] for err in errors if err.get("code") == 11000]
+        n_other = len(errors) - len(duplicates)
+        if n_other:
+            logger.warning("[users] %d users non insérés (erreurs hors doublons)", n_other)
+        if duplicates:
+            logger.debug("[users] %d users déjà présents, mis à jour par upsert", len(duplicates))
+            users_col.bulk_write(
+                [_user_upsert(doc["_id"], doc["owned_app_ids"]) for doc in duplicates], ordered=False
+            )
+        return len(batch) - n_other
+    return len(batch)
+
+
+def _create_users_indexes(users_col, build_indexes: bool) -> None:
     # Optional extra indexes controlled by --build-indexes
     if build_indexes:
         logger.info("[users] Creating optional indexes on 'users' collection...")
         # Example: index on name for queries (doesn't need to be unique now)
-        users_col.create_index("name")
+        users_col.create_index("name", background=True)
         logger.debug("[users] Created index on 'name'")
         logger.info("[users] Optional user indexes ready.")
     else:
@@ -529,8 +1641,12 @@ def ask_yes_no(question: str, default: bool = False) -> bool:
 def _download_file(url: str, dest_path: Path) -> None:
     """
     Download a file from url to dest_path.
+
+    The body is written to '<dest_path>.part' and renamed once complete, so
+    dest_path never exists half-written (other steps only check exists()).
     """
     dest_path.parent.mkdir(parents=True, exist_ok=True)
+    part_path = dest_path.with_name(dest_path.name + ".part")
     logger.info("[data] Downloading %s -> %s", url, dest_path)
 
     # Pretend to be a normal browser (some servers block default Python clients).
@@ -555,8 +1671,9 @@ def _download_file(url: str, dest_path: Path) -> None:
                 except ValueError:
                     logger.debug("[data] Could not parse Content-Length: %r", content_length)
 
-            with dest_path.open("wb") as f_out:
-                shutil.copyfileobj(resp, f_out)
+            with part_path.open("wb") as f_out:
+                shutil.copyfileobj(resp, f_out, length=DOWNLOAD_BUFFER_SIZE)
+        os.replace(part_path, dest_path)
 
     except HTTPError as e:
         logger.error("[data] HTTP error while downloading %s: %s %s", url, e.code, e.reason)
@@ -605,7 +1722,7 @@ def _extract_reviews_zip_flat(zip_path: Path, dest_dir: Path) -> None:
             logger.debug("[data] Extracting %s -> %s", info.filename, target_path)
 
             with zf.open(info, "r") as src, target_path.open("wb") as dst:
-                shutil.copyfileobj(src, dst)
+                shutil.copyfileobj(src, dst, length=1 << 20)  # 1MB au lieu des 64KB par défaut
             extracted_count += 1
 
     logger.info("[data] Extracted %d CSV file(s) into %s", extracted_count, dest_dir)
@@ -644,17 +1761,22 @@ def ensure_reviews_present() -> None:
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     _download_file(REVIEWS_ZIP_URL, tmp_zip_path)
 
-def ensure_data_files_present() -> None:
-    """S'assure que les jeux ET les reviews sont sur S3."""
+def ensure_games_source_present() -> None:
+    """S'assure que games.json est disponible (sur S3, ou en local sans S3_BUCKET)."""
     if not S3_BUCKET:
-        logger.warning("[s3] S3_BUCKET non défini. Utilisation du mode local.")
         ensure_games_json_present()
-        ensure_reviews_present()
         return
-
-    logger.info(f"[s3] Vérification des fichiers sur le bucket : {S3_BUCKET}")
-    # Vérifie et upload sur S3 si absent (pour les deux fichiers)
     ensure_reviews_zip_on_s3(S3_BUCKET, S3_GAMES_KEY, GAMES_JSON_URL)
+
+
+def ensure_reviews_source_present() -> None:
+    """S'assure que le ZIP des reviews est disponible (sur S3, ou en local sans S3_BUCKET)."""
+    if not S3_BUCKET and REVIEWS_STREAM_HTTP:
+        logger.info("[data] REVIEWS_STREAM_HTTP : lecture directe du ZIP par requêtes Range, pas de téléchargement")
+        return
+    if not S3_BUCKET:
+        ensure_reviews_present()
+        return
     ensure_reviews_zip_on_s3(S3_BUCKET, S3_REVIEWS_KEY, REVIEWS_ZIP_URL)
 
 
@@ -665,8 +1787,51 @@ def main():
     # --- CONFIGURATION & LOGS ---
     parser = argparse.ArgumentParser(description="Import Steam Data")
     parser.add_argument("--build-indexes", action="store_true")
+    parser.add_argument(
+        "--build-text-index",
+        action="store_true",
+        help=(
+            "Also build the (expensive) text indexes on games.name and "
+            "reviews.review_text; requires --build-indexes."
+        ),
+    )
     parser.add_argument("--log-level", default="INFO") # Passer en INFO pour éviter de saturer les logs CloudWatch
     parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=0,
+        help=(
+            "Parse review CSVs in N worker processes (e.g. half the CPU count) when "
+            "parsing is CPU-bound; 0 keeps the --workers thread pool."
+        ),
+    )
+    ack_group = parser.add_mutually_exclusive_group()
+    ack_group.add_argument(
+        "--ack-reviews",
+        dest="ack_reviews",
+        action="store_true",
+        default=True,
+        help="Wait for the primary to acknowledge each reviews batch (w=1, j=False). This is the default.",
+    )
+    ack_group.add_argument(
+        "--unacked-reviews",
+        dest="ack_reviews",
+        action="store_false",
+        help=(
+            "Write reviews with w=0 (fire-and-forget): faster, but a failed insert is silently lost, "
+            "the reported count is the number of docs sent, and the checkpoint, index and users "
+            "steps may run before every insert has been applied."
+        ),
+    )
+    parser.add_argument(
+        "--aggregate-rebuild",
+        action="store_true",
+        help=(
+            "Build users with the server-side $group aggregation over all reviews "
+            "instead of the user/app map collected while importing reviews."
+        ),
+    )
     args = parser.parse_args()
     setup_logging(args.log_level)
 
@@ -678,31 +1843,74 @@ def main():
         logger.warning("[main] games.json est vide, suppression pour retéléchargement...")
         GAMES_JSON_PATH.unlink()
 
-    ensure_data_files_present() # Vérifie S3 pour les deux fichiers
-    
+    if S3_BUCKET:
+        logger.info(f"[s3] Vérification des fichiers sur le bucket : {S3_BUCKET}")
+    else:
+        logger.warning("[s3] S3_BUCKET non défini. Utilisation du mode local.")
+
     env = load_env(ENV_PATH)
-    db = get_db_from_env(env)
+    db = get_db_from_env(env, max_pool_size=max(200, args.workers * 4))
     existing = set(db.list_collection_names())
 
-    # 1. GAMES (Nouveau mode S3 Streaming)
-    if GAMES_COLLECTION not in existing:
-        if S3_BUCKET:
-            import_games_from_s3(db, build_indexes=args.build_indexes)
+    # Le téléchargement du ZIP des reviews (réseau) tourne en arrière-plan
+    # pendant l'import des jeux ; on ne l'attend qu'avant import_reviews.
+    user_apps = None
+    reviews_imported = False
+    with ThreadPoolExecutor(max_workers=1) as downloader:
+        reviews_ready = None
+        # Un checkpoint restant signifie un import de reviews interrompu : on le reprend
+        if REVIEWS_COLLECTION not in existing or REVIEWS_CHECKPOINT_PATH.exists():
+            reviews_ready = downloader.submit(ensure_reviews_source_present)
+
+        # 1. GAMES (Nouveau mode S3 Streaming)
+        if GAMES_COLLECTION not in existing:
+            ensure_games_source_present()
+            if S3_BUCKET:
+                import_games_from_s3(
+                    db, build_indexes=args.build_indexes, build_text_index=args.build_text_index
+                )
+            else:
+                import_games(
+                    db, build_indexes=args.build_indexes, build_text_index=args.build_text_index
+                ) # Fallback local
         else:
-            import_games(db, build_indexes=args.build_indexes) # Fallback local
-    else:
-        logger.info("[games] Collection exists, skipping.")
-    
-    if REVIEWS_COLLECTION not in existing:
-        import_reviews(db, build_indexes=args.build_indexes)
-    else:
-        logger.info("[Review] Collection exists, skipping.")
+            logger.info("[games] Collection exists, skipping.")
+
+        # 2. REVIEWS
+        if reviews_ready is not None:
+            reviews_ready.result()
+            reviews_imported = True
+            user_apps = import_reviews(
+                db,
+                build_indexes=args.build_indexes,
+                workers=args.workers,
+                acknowledged=args.ack_reviews,
+                processes=args.processes,
+                env=env,
+                collect_users=not args.aggregate_rebuild,
+                build_text_index=args.build_text_index,
+            )
+        else:
+            logger.info("[Review] Collection exists, skipping.")
 
     # ----------------------------------------------------------------------
     # 3. USERS
     # ----------------------------------------------------------------------
-    if USERS_COLLECTION not in set(db.list_collection_names()):
-        build_users_from_reviews(db, build_indexes=args.build_indexes)
+    # Relu ici et non au démarrage : pendant l'import des reviews (des heures),
+    # l'API servie en parallèle peut avoir créé 'users'
+    users_present = USERS_COLLECTION in set(db.list_collection_names())
+    if user_apps is not None:
+        # Users vus pendant l'import : pas besoin de relire toutes les reviews
+        write_users_from_import(
+            db, user_apps, build_indexes=args.build_indexes, already_present=users_present
+        )
+    elif args.aggregate_rebuild or not users_present or reviews_imported:
+        # Reviews importées sans map fiable (reprise, fichier en erreur) : si
+        # 'users' existe, le build incrémental ne reprend que les reviews dont
+        # _ingested_at est postérieur au dernier build
+        build_users_from_reviews(
+            db, build_indexes=args.build_indexes, already_present=users_present
+        )
 
     logger.info("[main] All done. Nettoyage final...")
     # Optionnel: supprimer games.json à la fin pour libérer encore plus de place
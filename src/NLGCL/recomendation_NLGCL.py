@@ -3,32 +3,110 @@ import logging
 from logging import getLogger
 import torch
 import os
+import json
+import threading
+import io
+from contextlib import contextmanager, nullcontext
 from recbole.utils import init_logger, init_seed, set_color
 from recbole_gnn.config import Config
 from recbole_gnn.utils import create_dataset, data_preparation, get_model, get_trainer
 
+import numpy as np
 import pandas as pd
 from pymongo import MongoClient
 import boto3
+from boto3.s3.transfer import TransferConfig
+
+try:
+    from safetensors import safe_open
+    from safetensors.torch import save_file
+except ImportError:  # safetensors est optionnel, checkpoints .pth en secours
+    safe_open = save_file = None
+
+try:
+    import onnxruntime as ort
+except ImportError:  # onnxruntime est optionnel (NLGCL_SCORER=onnx)
+    ort = None
+
+try:
+    import faiss
+except ImportError:  # faiss est optionnel, top-k exact en secours
+    faiss = None
 
 logger = logging.getLogger(__name__)
 
+# Modèles déjà chargés : (model_filename, dataset_name, config files) -> (model, dataset, train_data, device)
+_MODEL_CACHE = {}
+# Un seul chargement à la fois : un second appel attend puis réutilise le cache
+_SETUP_LOCK = threading.Lock()
+_DOWNLOAD_LOCK = threading.Lock()
+
+# Téléchargement du checkpoint en parts de 8MB, 16 GET en parallèle
+_MODEL_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=16,
+    use_threads=True,
+)
+# Scorer de recommend_topk : "eager" (défaut), "compile" (torch.compile,
+# kernels inductor) ou "onnx" (graphe exporté, ONNX Runtime) ; retombe sur
+# eager si la compilation / l'export échoue
+NLGCL_SCORER = os.getenv("NLGCL_SCORER", "eager")
+# torch.mm(..., out_dtype=float32) disponible sur ce torch/GPU ? (None = pas encore essayé)
+_MM_OUT_DTYPE_OK = None
+# k du warmup au chargement (topk par défaut de l'API) ; un autre k compile à la demande
+DEFAULT_TOPK = 30
+_COMPILED_SCORERS = {}
+
+INT32_MAX = 2**31 - 1
+
+# Clés d'embedding du checkpoint à ignorer (tailles dépendantes du dataset)
+EMBEDDING_KEYS_TO_IGNORE = ('user_embedding.weight', 'item_embedding.weight')
+
+# Top-k approché : NLGCL_ANN=hnsw construit un index FAISS HNSW (produit
+# scalaire) sur les embeddings items ; vide = top-k exact (défaut)
+NLGCL_ANN = os.getenv("NLGCL_ANN", "")
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = int(os.getenv("NLGCL_HNSW_EF_SEARCH", "128"))
+
+# Sidecar du dossier dataset : mtime/taille du .inter ayant produit le cache Recbole
+CACHE_META_FILENAME = "cache_meta.json"
+
+# Dossier local des modèles ; /dev/shm (tmpfs) évite au torch.load de relire le disque
+MODEL_LOCAL_DIR = os.getenv("NLGCL_MODEL_DIR", "/tmp")
+# Checkpoint servi par défaut, préchargé depuis S3 dès l'import (NLGCL_PREFETCH=0 pour désactiver)
+DEFAULT_MODEL = os.getenv("NLGCL_MODEL", "NLGCL-Dec-02-2025_17-09-34.pth")
+NLGCL_PREFETCH = os.getenv("NLGCL_PREFETCH", "1") != "0"
+
 def download_model_from_s3(model_name):
-    """Télécharge le modèle depuis S3 vers /tmp s'il n'est pas déjà présent."""
+    """Télécharge le modèle depuis S3 vers MODEL_LOCAL_DIR (/tmp) s'il n'est pas déjà présent."""
     s3_bucket = os.getenv("S3_BUCKET")
-    local_path = f"/tmp/{model_name}"
+    local_path = os.path.join(MODEL_LOCAL_DIR, model_name)
     
-    if not os.path.exists(local_path):
-        getLogger().info(f"📥 Téléchargement du modèle {model_name} depuis S3 ({s3_bucket})...")
-        s3 = boto3.client('s3')
-        # On suppose que ton modèle est dans un dossier 'models/' sur S3
-        s3.download_file(s3_bucket, f"models/{model_name}", local_path)
-        getLogger().info("✅ Téléchargement terminé.")
-    else:
-        getLogger().info(f"ℹ️ Modèle {model_name} déjà présent dans /tmp.")
+    with _DOWNLOAD_LOCK:
+        if not os.path.exists(local_path):
+            getLogger().info(f"📥 Téléchargement du modèle {model_name} depuis S3 ({s3_bucket})...")
+            s3 = boto3.client('s3')
+            # On suppose que ton modèle est dans un dossier 'models/' sur S3.
+            # Fichier temporaire puis rename : un autre worker ne voit jamais un .pth à moitié écrit
+            part_path = f"{local_path}.{os.getpid()}.part"
+            s3.download_file(s3_bucket, f"models/{model_name}", part_path, Config=_MODEL_TRANSFER_CONFIG)
+            os.replace(part_path, local_path)
+            getLogger().info("✅ Téléchargement terminé.")
+        else:
+            getLogger().info(f"ℹ️ Modèle {model_name} déjà présent dans {MODEL_LOCAL_DIR}.")
     
     return local_path
 
+def _prefetch_default_model():
+    """Thread de fond : télécharge DEFAULT_MODEL pendant que l'API démarre."""
+    try:
+        download_model_from_s3(DEFAULT_MODEL)
+    except Exception as e:
+        # Pas bloquant : setup_recbole_model retentera le téléchargement
+        getLogger().warning(f"[prefetch] Préchargement de {DEFAULT_MODEL} échoué : {e}")
+
 def download_dataset_from_s3(dataset_name, bucket_name):
     """
     Télécharge game.inter depuis S3 vers le dossier local attendu par RecBole
@@ -51,16 +129,192 @@ def download_dataset_from_s3(dataset_name, bucket_name):
             raise
     return local_dir
 
+_IS_POSIX = os.name == "posix"  # Linux, macOS, etc.
+
 def normalize_path(path: str) -> str:
     """
     If running on Linux, convert Windows-style backslashes to forward slashes.
     Otherwise, return the path unchanged.
     """
-    if os.name == "posix":  # Linux, macOS, etc.
+    if _IS_POSIX and "\\" in path:
         return path.replace("\\", "/")
     return path
 
-def recommend_topk(model, dataset, train_data, user_id, topk=30, device='cpu'):
+def build_seen_index(inter_feat, user_num):
+    """
+    Index CSR user -> items vus, construit une fois au chargement du modèle :
+    les items de l'user u sont seen_items[seen_ptr[u]:seen_ptr[u + 1]].
+
+    Stocké en int32 (moitié moins de mémoire que int64) tant que le nombre
+    d'interactions le permet ; repassé en long au moment d'indexer.
+    """
+    users = inter_feat['user']
+    index_dtype = torch.int32 if len(users) < INT32_MAX else torch.long
+    order = torch.argsort(users, stable=True)
+    counts = torch.bincount(users, minlength=user_num)
+    seen_ptr = torch.zeros(user_num + 1, dtype=index_dtype)
+    torch.cumsum(counts, dim=0, out=seen_ptr[1:])
+    return seen_ptr, inter_feat['app_id'][order].to(index_dtype)
+
+def _seen_items(model, train_data, user_idx):
+    seen_index = getattr(model, '_seen_index', None)
+    if seen_index is None:
+        inter_feat = train_data.dataset.inter_feat
+        return inter_feat['app_id'][inter_feat['user'] == user_idx]
+    seen_ptr, seen_items = seen_index
+    return seen_items[seen_ptr[user_idx]:seen_ptr[user_idx + 1]]
+
+def _item_tokens(dataset, indices):
+    """ids internes (tensor CPU) -> tokens app_id, via le tableau numpy de Recbole."""
+    return dataset.field2id_token['app_id'][indices.numpy()].tolist()
+
+def _score_topk(item_w, user_emb, seen_mask, k):
+    """Scores user/items, items vus à -inf, puis top-k (formes statiques pour torch.compile)."""
+    # Conversion fusionnée par inductor dans la réduction : accumulation fp32
+    scores = torch.mv(item_w.float(), user_emb.float()).masked_fill(seen_mask, float('-inf'))
+    return torch.topk(scores, k)
+
+def _user_scores(item_w, user_emb, out=None):
+    """
+    Scores [item_num] en float32 (accumulation et sortie) quel que soit le dtype
+    de stockage : en fp16, une sortie fp16 déborderait en inf pour des
+    embeddings de grande norme et départagerait mal les quasi ex aequo.
+    """
+    global _MM_OUT_DTYPE_OK
+    if item_w.dtype == torch.float32:
+        return torch.mv(item_w, user_emb, out=out)
+    scores = None
+    if item_w.is_cuda and _MM_OUT_DTYPE_OK is not False:
+        # GEMM cuBLAS entrées fp16/bf16, sortie fp32 (selon la version de torch)
+        try:
+            scores = torch.mm(item_w, user_emb[:, None], out_dtype=torch.float32)[:, 0]
+            _MM_OUT_DTYPE_OK = True
+        except (TypeError, RuntimeError):
+            _MM_OUT_DTYPE_OK = False
+    if scores is None:
+        scores = torch.mv(item_w.float(), user_emb.float())
+    return scores if out is None else out.copy_(scores)
+
+def _compiled_scorer(device):
+    """_score_topk compilé (un par type de device), ou None si indisponible / en échec."""
+    device_type = torch.device(device).type
+    if device_type not in _COMPILED_SCORERS:
+        try:
+            # Pas de CUDA graphs ("reduce-overhead") : les cudagraph trees d'inductor
+            # sont propres à chaque thread, chaque thread du pool FastAPI
+            # ré-enregistrerait ses graphes (et son pool mémoire) au fil des requêtes
+            mode = "max-autotune-no-cudagraphs" if device_type == "cuda" else "default"
+            _COMPILED_SCORERS[device_type] = torch.compile(_score_topk, mode=mode, dynamic=False)
+        except Exception as e:
+            getLogger().warning(f"[scorer] torch.compile indisponible ({e}), scorer eager.")
+            _COMPILED_SCORERS[device_type] = None
+    return _COMPILED_SCORERS[device_type]
+
+@contextmanager
+def _seen_mask(model, seen_items):
+    """Masque booléen [item_num] des items vus (buffer persistant s'il existe)."""
+    item_w = model.item_embedding.weight
+    seen_mask = getattr(model, '_seen_mask_buf', None)
+    if seen_mask is None:
+        seen_mask = torch.zeros(item_w.shape[0], dtype=torch.bool, device=item_w.device)
+    seen_mask[seen_items] = True
+    try:
+        yield seen_mask
+    finally:
+        # Buffer persistant : on ne remet à False que les cases posées, O(deg(u))
+        seen_mask[seen_items] = False
+
+def _compiled_topk(model, user_idx, seen_items, k, device):
+    scorer = _compiled_scorer(device)
+    if scorer is None:
+        return None
+    try:
+        with _seen_mask(model, seen_items) as seen_mask:
+            return scorer(model.item_embedding.weight, model.user_embedding.weight[user_idx], seen_mask, k)
+    except Exception as e:
+        getLogger().warning(f"[scorer] échec du scorer compilé ({e}), retour au scorer eager.")
+        _COMPILED_SCORERS[torch.device(device).type] = None
+        return None
+
+class _OnnxScorer(torch.nn.Module):
+    """Graphe exporté en ONNX : scores items (table en constante), masque des vus, top-k."""
+
+    def __init__(self, item_w, k):
+        super().__init__()
+        self.register_buffer('item_w', item_w)
+        self.k = k
+
+    def forward(self, user_emb, seen_mask):
+        scores = torch.mv(self.item_w, user_emb).masked_fill(seen_mask, float('-inf'))
+        return torch.topk(scores, self.k)
+
+def _onnx_session(model, k, device):
+    """Session ONNX Runtime pour ce k (exportée une seule fois), ou None si indisponible."""
+    if ort is None:
+        getLogger().warning("[scorer] NLGCL_SCORER=onnx mais onnxruntime n'est pas installé, scorer eager.")
+        return None
+    sessions = model.__dict__.setdefault('_onnx_sessions', {})
+    if k not in sessions:
+        try:
+            item_w = model.item_embedding.weight.detach().float().cpu()
+            graph = io.BytesIO()
+            torch.onnx.export(
+                _OnnxScorer(item_w, k),
+                (torch.zeros(item_w.shape[1]), torch.zeros(item_w.shape[0], dtype=torch.bool)),
+                graph,
+                input_names=['user_emb', 'seen_mask'],
+                output_names=['scores', 'indices'],
+                opset_version=17,
+                dynamo=False,
+            )
+            providers = ['CPUExecutionProvider']
+            if torch.device(device).type == 'cuda':
+                providers.insert(0, 'CUDAExecutionProvider')
+            sessions[k] = ort.InferenceSession(graph.getvalue(), providers=providers)
+            getLogger().info(f"[scorer] Graphe ONNX exporté (top-{k}, {providers[0]}).")
+        except Exception as e:
+            getLogger().warning(f"[scorer] export ONNX impossible ({e}), scorer eager.")
+            sessions[k] = None
+    return sessions[k]
+
+def _onnx_topk(model, user_idx, seen_items, k, device):
+    session = _onnx_session(model, k, device)
+    if session is None:
+        return None
+    user_emb = model.user_embedding.weight[user_idx].detach().float().cpu().numpy()
+    with _seen_mask(model, seen_items) as seen_mask:
+        scores, indices = session.run(None, {'user_emb': user_emb, 'seen_mask': seen_mask.cpu().numpy()})
+    return torch.from_numpy(scores), torch.from_numpy(indices)
+
+def build_ann_index(model):
+    """
+    Index FAISS HNSW sur item_embedding.weight (METRIC_INNER_PRODUCT, comme le
+    score NLGCL), ou None si NLGCL_ANN n'est pas "hnsw" ou faiss absent.
+    """
+    if NLGCL_ANN != "hnsw":
+        return None
+    if faiss is None:
+        getLogger().warning("[ann] NLGCL_ANN=hnsw mais faiss n'est pas installé, top-k exact.")
+        return None
+    item_w = model.item_embedding.weight.detach().float().cpu().numpy()
+    index = faiss.IndexHNSWFlat(item_w.shape[1], HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    index.hnsw.efSearch = HNSW_EF_SEARCH
+    index.add(item_w)
+    getLogger().info(f"[ann] Index HNSW construit sur {item_w.shape[0]} items.")
+    return index
+
+def _ann_topk(model, ann_index, user_idx, seen_items, k):
+    """Top-k approché : on demande k + |vus| voisins puis on retire les items vus."""
+    user_emb = model.user_embedding.weight[user_idx].detach().float().cpu().numpy()
+    seen = seen_items.cpu().numpy()
+    _, neighbours = ann_index.search(user_emb[None], min(k + len(seen), ann_index.ntotal))
+    neighbours = neighbours[0]
+    # -1 = pas assez de voisins trouvés
+    neighbours = neighbours[(neighbours >= 0) & ~np.isin(neighbours, seen)]
+    return torch.from_numpy(neighbours[:k])
+
+def recommend_topk(model, dataset, train_data, user_id, topk=DEFAULT_TOPK, device='cpu'):
     """
     Retourne le top-k items pour un utilisateur donné.
 
@@ -81,37 +335,246 @@ def recommend_topk(model, dataset, train_data, user_id, topk=30, device='cpu'):
 
     logger = getLogger()
 
-    # Tous les items
-    all_items = torch.arange(dataset.item_num, device=device)
+    # Items déjà vus par l'utilisateur : index CSR construit au chargement
+    # (O(deg(u))), sinon scan de toutes les interactions
+    seen_items = _seen_items(model, train_data, user_idx).to(device=device, dtype=torch.long)
+
+    k = min(topk, dataset.item_num)
+
+    ann_index = getattr(model, '_ann_index', None)
+    if ann_index is not None:
+        topk_items = _item_tokens(dataset, _ann_topk(model, ann_index, user_idx, seen_items, k))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(set_color(f"Top-{topk} recommandations (HNSW) pour user {dataset.id2token('user', user_idx)}", "green"))
+            logger.info(topk_items)
+        return topk_items
+
+    result = None
+    # Buffers de scores/masque réutilisés d'une requête à l'autre (aucune
+    # allocation [item_num] par appel) : un seul scoring à la fois par modèle
+    score_lock = getattr(model, '_score_lock', None) or nullcontext()
+    with torch.no_grad(), score_lock:
+        if NLGCL_SCORER == "compile":
+            result = _compiled_topk(model, user_idx, seen_items, k, device)
+        elif NLGCL_SCORER == "onnx":
+            result = _onnx_topk(model, user_idx, seen_items, k, device)
+        if result is None:
+            # Calculer les scores : un seul produit matrice-vecteur sur tous les items
+            # (BLAS), puis les items déjà vus sont exclus avec -inf
+            user_emb = model.user_embedding.weight[user_idx]
+            scores = _user_scores(model.item_embedding.weight, user_emb, getattr(model, '_scores_buf', None))
+            scores.index_fill_(0, seen_items, float('-inf'))
+            result = torch.topk(scores, k)
 
-    # Items déjà vus par l'utilisateur
-    inter_feat = train_data.dataset.inter_feat
-    user_mask = inter_feat['user'] == user_idx
-    seen_items = inter_feat['app_id'][user_mask].tolist()
+        # Copie sur CPU encore sous le lock : aucune sortie d'un scorer ne peut
+        # être réécrite par la requête suivante avant d'avoir été lue
+        topk_scores, topk_indices = (t.cpu() for t in result)
 
-    # Items candidats
-    candidate_items = torch.tensor([i for i in all_items if i.item() not in seen_items], device=device)
+    # Top-k (les indices sont directement des ids d'items) : indexation numpy
+    # dans la table des tokens
+    topk_indices = topk_indices[topk_scores != float('-inf')]  # moins de k items non vus
+    topk_items = _item_tokens(dataset, topk_indices)
+
+    # Message coloré et id2token construits seulement si le niveau INFO est actif
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(set_color(f"Top-{topk} recommandations pour user {dataset.id2token('user', user_idx)}", "green"))
+        logger.info(topk_items)
+
+    return topk_items
+
+def _seen_pairs(model, train_data, user_idx):
+    """
+    (lignes, items) des interactions déjà vues pour un lot d'users, la ligne i
+    correspondant à user_idx[i] ; avec l'index CSR, tout est vectorisé.
+    """
+    seen_index = getattr(model, '_seen_index', None)
+    if seen_index is None:
+        per_user = [_seen_items(model, train_data, int(u)) for u in user_idx]
+        rows = torch.repeat_interleave(
+            torch.arange(len(per_user)), torch.tensor([len(items) for items in per_user], dtype=torch.long)
+        )
+        return rows, torch.cat(per_user) if per_user else torch.empty(0, dtype=torch.long)
 
+    seen_ptr, seen_items = seen_index
+    starts = seen_ptr[user_idx].long()
+    lengths = seen_ptr[user_idx + 1].long() - starts
+    rows = torch.repeat_interleave(torch.arange(len(user_idx)), lengths)
+    # Position de chaque interaction dans seen_items : début de son user + rang dans le user
+    row_offsets = torch.cumsum(lengths, dim=0) - lengths
+    positions = torch.arange(int(lengths.sum())) - row_offsets[rows] + starts[rows]
+    return rows, seen_items[positions.to(seen_items.device)]
+
+def recommend_topk_batch(model, dataset, train_data, user_ids, topk=30, device='cpu'):
+    """
+    Variante de recommend_topk pour plusieurs utilisateurs à la fois : un seul
+    produit matriciel [B, d] x [d, I] au lieu de B produits matrice-vecteur.
+
+    Args:
+        user_ids: liste d'ids (tokens) d'utilisateurs.
+        (les autres arguments comme recommend_topk)
+
+    Returns:
+        list: pour chaque utilisateur, dans l'ordre, ses top-k item_ids recommandés.
+    """
+    if not user_ids:
+        return []
+    user_idx = torch.as_tensor([dataset.token2id('user', str(u)) for u in user_ids], dtype=torch.long)
+    rows, seen = _seen_pairs(model, train_data, user_idx)
 
-    # Calculer les scores
     with torch.no_grad():
-        user_emb = model.user_embedding(torch.tensor([user_idx], device=device))
-        item_emb = model.item_embedding(candidate_items)
-        scores = (user_emb * item_emb).sum(dim=-1)  # produit scalaire
+        # Produit en float32 : la transposée est gardée en fp32 (voir _load_recbole_model)
+        user_emb = model.user_embedding.weight[user_idx.to(device)].float()
+        item_weight_T = getattr(model, '_item_weight_T', None)
+        if item_weight_T is None:
+            item_weight_T = model.item_embedding.weight.T.float()
+        scores = user_emb @ item_weight_T
+        scores.index_put_(
+            (rows.to(device), seen.to(device=device, dtype=torch.long)),
+            torch.tensor(float('-inf'), device=device),
+        )
 
+    topk_scores, topk_indices = torch.topk(scores, min(topk, dataset.item_num), dim=1)
+    topk_scores, topk_indices = topk_scores.cpu(), topk_indices.cpu()
+    return [
+        _item_tokens(dataset, indices[row_scores != float('-inf')])
+        for row_scores, indices in zip(topk_scores, topk_indices)
+    ]
 
-    # Top-k
-    topk_scores, topk_indices = torch.topk(scores, min(topk, len(candidate_items)))
-    topk_items = [dataset.id2token('app_id', idx.item()) for idx in topk_indices]
+def _load_checkpoint(model_path):
+    """
+    Charge un checkpoint RecBole en mémoire mappée (mmap) sur CPU : les tenseurs
+    ne sont lus qu'au moment où load_state_dict les copie sur le device du
+    modèle, et les embeddings ignorés ne sont jamais lus.
+
+    Les checkpoints RecBole contiennent toujours la Config (objet Python) :
+    weights_only=True échouerait à chaque fois, d'où weights_only=False. Pour
+    éviter l'unpickling, convertir en .safetensors (convert_checkpoint_to_safetensors).
+    """
+    return torch.load(model_path, map_location='cpu', mmap=True, weights_only=False)
 
-    logger.info(set_color(f"Top-{topk} recommandations pour user {dataset.id2token('user', user_idx)}", "green"))
-    logger.info(topk_items)
+def _load_safetensors_state_dict(model_path):
+    """state_dict depuis un .safetensors (mmap, aucun unpickling), sans les clés d'embedding."""
+    if safe_open is None:
+        raise ImportError("safetensors n'est pas installé, impossible de charger " + model_path)
+    with safe_open(model_path, framework="pt", device="cpu") as f:
+        return {key: f.get_tensor(key) for key in f.keys() if key not in EMBEDDING_KEYS_TO_IGNORE}
 
-    return topk_items
+def convert_checkpoint_to_safetensors(pth_path, out_path=None):
+    """
+    Conversion unique (hors ligne) d'un checkpoint RecBole .pth en .safetensors,
+    à uploader ensuite dans models/ sur S3 à la place du .pth.
+    """
+    if save_file is None:
+        raise ImportError("safetensors n'est pas installé.")
+    out_path = out_path or os.path.splitext(pth_path)[0] + ".safetensors"
+    state_dict = _load_checkpoint(pth_path)['state_dict']
+    save_file(
+        {key: tensor.contiguous() for key, tensor in state_dict.items() if key not in EMBEDDING_KEYS_TO_IGNORE},
+        out_path,
+    )
+    getLogger().info(f"Checkpoint converti : {out_path}")
+    return out_path
+
+def _cast_embeddings_for_scoring(model, device):
+    """
+    Le modèle ne sert qu'à scorer (produit scalaire user/items, limité par la
+    bande passante mémoire) : les embeddings passent en demi-précision, ce qui
+    divise par deux les octets lus. Les scores restent calculés en float32
+    (_user_scores), seul le stockage est réduit.
+
+    fp16 par défaut sur GPU ; sur CPU, bf16 seulement si demandé via
+    NLGCL_SCORE_DTYPE=bfloat16 (gain réel uniquement avec AVX512-BF16/AMX).
+    """
+    dtype_name = os.getenv("NLGCL_SCORE_DTYPE") or ("float16" if str(device).startswith("cuda") else "float32")
+    dtype = getattr(torch, dtype_name)
+    if dtype == torch.float32:
+        return
+    if dtype == torch.float16:
+        max_abs = max(e.weight.detach().abs().max().item() for e in (model.user_embedding, model.item_embedding))
+        if max_abs > torch.finfo(torch.float16).max:
+            getLogger().warning(f"Embeddings hors de la plage fp16 (|w| max = {max_abs:.3g}), conservés en float32.")
+            return
+    for embedding in (model.user_embedding, model.item_embedding):
+        embedding.weight.data = embedding.weight.data.to(dtype)
+    getLogger().info(f"Embeddings de scoring convertis en {dtype_name}.")
+
+def _warmup_scorer(model, device, k):
+    """
+    Compile (torch.compile) ou exporte (ONNX) le scorer au chargement, avec un
+    appel à vide : la première requête n'attend plus la compilation sous _score_lock.
+    """
+    if NLGCL_SCORER not in ("compile", "onnx"):
+        return
+    no_seen = torch.empty(0, dtype=torch.long, device=device)
+    with torch.no_grad():
+        if NLGCL_SCORER == "compile":
+            result = _compiled_topk(model, 0, no_seen, k, device)
+        else:
+            result = _onnx_topk(model, 0, no_seen, k, device)
+    if result is not None:
+        getLogger().info(f"[scorer] Scorer {NLGCL_SCORER} prêt (top-{k}).")
+
+def _attach_score_buffers(model):
+    """Buffers persistants [item_num] de recommend_topk (scores et masque des items vus)."""
+    item_w = model.item_embedding.weight
+    model._scores_buf = torch.empty(item_w.shape[0], dtype=torch.float32, device=item_w.device)
+    model._seen_mask_buf = torch.zeros(item_w.shape[0], dtype=torch.bool, device=item_w.device)
+    model._score_lock = threading.Lock()
+
+def setup_recbole_model(model_path=None, dataset_name="game", config_file_list=None):
+    """
+    Charge (ou réutilise) le modèle NLGCL. Le checkpoint téléchargé depuis S3
+    est le nom de fichier de model_path, DEFAULT_MODEL si model_path est None.
+    """
+    model_filename = os.path.basename(model_path) if model_path else DEFAULT_MODEL
+    config_file_list = list(config_file_list or [])
+    cache_key = (model_filename, dataset_name, tuple(config_file_list))
+    with _SETUP_LOCK:
+        if cache_key not in _MODEL_CACHE:
+            _MODEL_CACHE[cache_key] = _load_recbole_model(model_filename, dataset_name, config_file_list)
+        else:
+            getLogger().info(f"ℹ️ Modèle {model_filename} déjà chargé, réutilisation.")
+        return _MODEL_CACHE[cache_key]
+
+def _invalidate_dataset_cache(dataset_dir, dataset_name):
+    """
+    Supprime les caches Recbole ({dataset}.dataset / .pth) uniquement si le
+    .inter a changé (mtime + taille, mémorisés dans cache_meta.json) : sinon
+    le dataset n'est pas reconstruit à chaque démarrage.
+    """
+    inter_path = os.path.join(dataset_dir, f'{dataset_name}.inter')
+    meta_path = os.path.join(dataset_dir, CACHE_META_FILENAME)
+    if not os.path.exists(inter_path):
+        # .inter absent (ou data_path surchargé) : on laisse Recbole signaler l'erreur
+        return
+    stat = os.stat(inter_path)
+    current = {"inter_mtime": stat.st_mtime, "inter_size": stat.st_size}
+
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        stored = None
+
+    if stored == current:
+        getLogger().info(f"Cache Recbole conservé ({dataset_name}.inter inchangé).")
+        return
+
+    cache_files = [f'{dataset_name}.dataset', f'{dataset_name}.pth']
+    for filename in cache_files:
+        full_path = os.path.join(dataset_dir, filename)
+        if os.path.exists(full_path):
+            os.remove(full_path)
+            getLogger().warning(f"Cache Recbole supprimé : {filename}")
 
-def setup_recbole_model(model_path, dataset_name, config_file_list):
+    # Écriture atomique : un crash en cours d'écriture ne laisse pas de sidecar corrompu
+    tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(current, f)
+    os.replace(tmp_path, meta_path)
 
-    model_filename = "NLGCL-Dec-02-2025_17-09-34.pth"
+def _load_recbole_model(model_filename, dataset_name, config_file_list):
+    """Chargement complet (S3, dataset, poids) ; appelé une fois par modèle via setup_recbole_model."""
     s3_bucket = os.getenv("S3_BUCKET")
     # --- NOUVEAU : Récupération depuis S3 ---
     # On passe le nom du fichier (NLGCL-Dec-02-2025_17-09-34.pth)
@@ -129,18 +592,12 @@ def setup_recbole_model(model_path, dataset_name, config_file_list):
     config = Config(model="NLGCL", dataset=dataset_name, config_file_list=config_file_list)
 
 
-    # --- 2. Suppression du cache pour forcer la recréation du Dataset ---
+    # --- 2. Suppression du cache si game.inter a changé depuis sa création ---
     dataset_dir = os.path.join(config['data_path'], dataset_name)
-    
-    cache_files = [f'{dataset_name}.dataset', f'{dataset_name}.pth']
-    for filename in cache_files:
-        full_path = os.path.join(dataset_dir, filename)
-        if os.path.exists(full_path):
-            os.remove(full_path)
-            getLogger().warning(f"Cache Recbole supprimé : {filename}")
+    _invalidate_dataset_cache(dataset_dir, dataset_name)
 
 
-    # --- 3. Charger le dataset (forcé de se recréer) ---
+    # --- 3. Charger le dataset (recréé seulement si le cache a été supprimé) ---
     # Le dataset est maintenant créé avec les dimensions de game.inter (1.1M users)
     dataset = create_dataset(config)
     train_data, _, _ = data_preparation(config, dataset)
@@ -151,30 +608,55 @@ def setup_recbole_model(model_path, dataset_name, config_file_list):
 
     # --- 5. Charger les poids ---
     # On utilise maintenant model_path qui pointe vers /tmp/
-    checkpoint = torch.load(model_path, map_location=config['device'], weights_only=False)
-        
-    if 'state_dict' in checkpoint:
+    if model_path.endswith(".safetensors"):
+        # Checkpoint converti (convert_checkpoint_to_safetensors) : mmap sans pickle,
+        # embeddings déjà exclus
+        pretrained_state_dict = _load_safetensors_state_dict(model_path)
+    else:
+        checkpoint = _load_checkpoint(model_path)
+        if 'state_dict' not in checkpoint:
+            raise ValueError("Le checkpoint ne contient pas 'state_dict'.")
         pretrained_state_dict = checkpoint['state_dict']
-        
-        # Clés d'embedding à ignorer au cas où une petite différence subsiste
-        keys_to_ignore = [
-            'user_embedding.weight',
-            'item_embedding.weight'
-        ]
 
         # Supprimer les clés du dictionnaire des poids si elles existent
-        for key in keys_to_ignore:
+        for key in EMBEDDING_KEYS_TO_IGNORE:
             if key in pretrained_state_dict:
                 del pretrained_state_dict[key]
                 getLogger().warning(f"Clé d'embedding supprimée du checkpoint car taille non correspondante : {key}")
-            
-        # Chargement partiel des poids (strict=False)
-        model.load_state_dict(pretrained_state_dict, strict=False)
-        getLogger().info(set_color("Chargement partiel réussi. Le modèle NLGCL est prêt.", "yellow"))
 
-    else:
-        raise ValueError("Le checkpoint ne contient pas 'state_dict'.")
+    # Chargement partiel des poids (strict=False)
+    model.load_state_dict(pretrained_state_dict, strict=False)
+    getLogger().info(set_color("Chargement partiel réussi. Le modèle NLGCL est prêt.", "yellow"))
         
     model.eval()
 
+    # Index des items vus par user, pour ne plus scanner inter_feat à chaque requête.
+    # seen_ptr reste sur CPU (bornes lues en Python), les items vont sur le device :
+    # plus de copie hôte -> GPU des items vus à chaque requête
+    seen_ptr, seen_items = build_seen_index(train_data.dataset.inter_feat, dataset.user_num)
+    model._seen_index = (seen_ptr, seen_items.to(config['device']))
+    _cast_embeddings_for_scoring(model, config['device'])
+    # Transposée [d, I] contiguë et en fp32 pour le GEMM de recommend_topk_batch
+    # (la table des jeux reste petite, la copie coûte peu de mémoire)
+    model._item_weight_T = model.item_embedding.weight.T.float().contiguous()
+    _attach_score_buffers(model)
+    model._ann_index = build_ann_index(model)
+    _warmup_scorer(model, config['device'], min(DEFAULT_TOPK, dataset.item_num))
+
     return model, dataset, train_data, config['device']
+
+
+# Préchargement du checkpoint dès l'import : la première requête ne paie plus
+# le téléchargement S3. Si elle arrive avant la fin, download_model_from_s3
+# attend sur _DOWNLOAD_LOCK puis trouve le fichier déjà présent.
+if NLGCL_PREFETCH and os.getenv("S3_BUCKET") and __name__ != "__main__":
+    threading.Thread(target=_prefetch_default_model, name="nlgcl-prefetch", daemon=True).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convertit un checkpoint NLGCL .pth en .safetensors")
+    parser.add_argument("pth_path", help="Chemin du checkpoint .pth")
+    parser.add_argument("--out", default=None, help="Chemin de sortie (défaut : même nom en .safetensors)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    convert_checkpoint_to_safetensors(args.pth_path, args.out)
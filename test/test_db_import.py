@@ -0,0 +1,142 @@
+"""
+Tests de DB_import sans MongoDB : base factice en mémoire, ZIP de reviews
+généré dans tmp_path.
+
+    python -m pytest test/test_db_import.py
+"""
+import csv
+import io
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import DB_import  # noqa: E402
+
+
+N_USERS = 300
+APP_IDS = (10, 20, 30)
+
+
+class _Crash(BaseException):
+    """Simule un arrêt brutal du processus (non rattrapé par les except Exception)."""
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+        self.write_concern = DB_import.WriteConcern(w=1)
+        self.insert_calls = 0
+        self.crash_on_insert = None
+
+    def with_options(self, **kwargs):
+        return self
+
+    def insert_many(self, docs, ordered=True, **kwargs):
+        self.insert_calls += 1
+        # Processus "mort" : plus aucun insert n'aboutit à partir de ce lot
+        if self.crash_on_insert is not None and self.insert_calls >= self.crash_on_insert:
+            raise _Crash()
+        errors, inserted = [], 0
+        for i, doc in enumerate(docs):
+            if doc["_id"] in self.docs:
+                errors.append({"index": i, "code": 11000})
+            else:
+                self.docs[doc["_id"]] = doc
+                inserted += 1
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": inserted})
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+    def list_collection_names(self):
+        return [name for name, col in self.items() if col.docs or name == DB_import.GAMES_COLLECTION]
+
+
+def _write_reviews_zip(path: Path, post_date: str = "October 22, 2024") -> None:
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        for app_id in APP_IDS:
+            buf = io.StringIO()
+            w = csv.writer(buf)
+            w.writerow(["user", "playtime", "post_date", "helpfulness", "review", "recommend", "early_access_review"])
+            for i in range(N_USERS):
+                w.writerow([f"u{i}", "1.5", post_date, "1", f"review {i}", "Recommended", ""])
+            z.writestr(f"Game Reviews/{app_id}_1.csv", buf.getvalue())
+
+
+@pytest.fixture
+def import_env(tmp_path, monkeypatch):
+    """main() branché sur un ZIP local et une base factice ; retourne (db, appels users)."""
+    zip_path = tmp_path / "reviews.zip"
+    _write_reviews_zip(zip_path)
+    db = FakeDB()
+    db[DB_import.GAMES_COLLECTION]  # games déjà importés
+    users_calls = []
+
+    monkeypatch.setattr(DB_import, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(DB_import, "GAMES_JSON_PATH", tmp_path / "games.json")
+    monkeypatch.setattr(DB_import, "REVIEWS_CHECKPOINT_PATH", tmp_path / ".reviews_checkpoint.jsonl")
+    monkeypatch.setattr(DB_import, "S3_BUCKET", None)
+    monkeypatch.setattr(DB_import, "BATCH_SIZE_REVIEWS", 100)
+    monkeypatch.setattr(DB_import, "_reviews_zip_source", lambda: str(zip_path))
+    monkeypatch.setattr(DB_import, "ensure_reviews_source_present", lambda: None)
+    monkeypatch.setattr(DB_import, "load_env", lambda path: {})
+    monkeypatch.setattr(DB_import, "get_db_from_env", lambda env, max_pool_size=200: db)
+    monkeypatch.setattr(
+        DB_import, "write_users_from_import", lambda db, user_apps, **kw: users_calls.append(("map", user_apps))
+    )
+    monkeypatch.setattr(
+        DB_import, "build_users_from_reviews", lambda db, **kw: users_calls.append(("aggregate", kw))
+    )
+    monkeypatch.setattr(sys, "argv", ["DB_import.py", "--workers", "1"])
+    return db, users_calls
+
+
+def test_resume_after_crash_during_first_csv(import_env):
+    db, users_calls = import_env
+    reviews = db[DB_import.REVIEWS_COLLECTION]
+
+    # 1er run : arrêt brutal au 2e lot du premier CSV, aucun fichier terminé
+    reviews.crash_on_insert = 2
+    with pytest.raises(_Crash):
+        DB_import.main()
+    assert 0 < len(reviews.docs) < N_USERS
+    assert DB_import.REVIEWS_CHECKPOINT_PATH.exists()
+    assert users_calls == []
+
+    # 2e run : l'import doit reprendre malgré une collection reviews déjà présente
+    reviews.crash_on_insert = None
+    DB_import.main()
+    assert len(reviews.docs) == N_USERS * len(APP_IDS)
+    assert not DB_import.REVIEWS_CHECKPOINT_PATH.exists()
+    assert len(users_calls) == 1
+
+
+
+def test_sept_abbreviation_parsed_by_csv_and_arrow_paths(tmp_path):
+    if DB_import.pa is None:
+        pytest.skip("pyarrow non installé")
+    zip_path = tmp_path / "reviews.zip"
+    _write_reviews_zip(zip_path, post_date="Sept 3, 2015")
+    expected = DB_import.datetime(2015, 9, 3)
+    assert DB_import.parse_date_mdy_long("Sept 3, 2015") == expected
+
+    csv_filename = f"Game Reviews/{APP_IDS[0]}_1.csv"
+    csv_docs, arrow_docs = (
+        [
+            doc
+            for batch in DB_import._iter_csv_batches(str(zip_path), csv_filename, APP_IDS[0], use_arrow=use_arrow)
+            for doc in batch
+        ]
+        for use_arrow in (False, True)
+    )
+
+    assert [doc.get("post_date") for doc in csv_docs] == [expected] * N_USERS
+    assert [doc.get("post_date") for doc in arrow_docs] == [expected] * N_USERS
@@ -0,0 +1,81 @@
+"""
+Tests du scoring de recomendation_NLGCL sans checkpoint ni S3 : petit modèle
+à embeddings aléatoires et dataset minimal exposant l'API Recbole utilisée.
+
+    python -m pytest test/test_recommendation_NLGCL.py
+"""
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "NLGCL"))
+R = pytest.importorskip("recomendation_NLGCL")
+
+
+class MiniDataset:
+    """Sous-ensemble de l'API Dataset de Recbole utilisé par recommend_topk."""
+
+    def __init__(self, user_num, item_num, inter_feat):
+        self.user_num, self.item_num = user_num, item_num
+        self.field2id_token = {
+            "user": np.array(["[PAD]"] + [str(100 + i) for i in range(1, user_num)]),
+            "app_id": np.array(["[PAD]"] + [str(1000 + i) for i in range(1, item_num)]),
+        }
+        self._token2id = {f: {t: i for i, t in enumerate(v)} for f, v in self.field2id_token.items()}
+        self.inter_feat = inter_feat
+
+    def token2id(self, field, token):
+        return self._token2id[field][token]
+
+    def id2token(self, field, idx):
+        return self.field2id_token[field][idx]
+
+
+def _make_model(scale, user_num=40, item_num=500, dim=64, n_inter=2000):
+    g = torch.Generator().manual_seed(0)
+    inter_feat = {
+        "user": torch.randint(1, user_num, (n_inter,), generator=g),
+        "app_id": torch.randint(1, item_num, (n_inter,), generator=g),
+    }
+    dataset = MiniDataset(user_num, item_num, inter_feat)
+    train_data = types.SimpleNamespace(dataset=dataset)
+    model = torch.nn.Module()
+    model.user_embedding = torch.nn.Embedding(user_num, dim)
+    model.item_embedding = torch.nn.Embedding(item_num, dim)
+    with torch.no_grad():
+        model.user_embedding.weight.normal_(generator=g).mul_(scale)
+        model.item_embedding.weight.normal_(generator=g).mul_(scale)
+    model.eval()
+    return model, dataset, train_data
+
+
+def _brute_force_topk(model, dataset, user_token, k):
+    """Référence : scores float32 sur les poids stockés, items vus exclus."""
+    u = dataset.token2id("user", str(user_token))
+    inter = dataset.inter_feat
+    seen = set(inter["app_id"][inter["user"] == u].tolist())
+    with torch.no_grad():
+        scores = model.item_embedding.weight.float() @ model.user_embedding.weight[u].float()
+    order = [i for i in torch.argsort(scores, descending=True, stable=True).tolist() if i not in seen]
+    return [dataset.id2token("app_id", i) for i in order[:k]]
+
+
+def test_fp16_storage_keeps_fp32_ranking_for_large_embeddings(monkeypatch):
+    # |score| ~ 40 * 40 * 64 : bien au-delà du max fp16 (65504)
+    model, dataset, train_data = _make_model(scale=40.0)
+    monkeypatch.setenv("NLGCL_SCORE_DTYPE", "float16")
+    R._cast_embeddings_for_scoring(model, "cpu")
+    assert model.item_embedding.weight.dtype == torch.float16
+
+    model._seen_index = R.build_seen_index(dataset.inter_feat, dataset.user_num)
+    model._item_weight_T = model.item_embedding.weight.T.float().contiguous()
+    R._attach_score_buffers(model)
+
+    users = [101, 115, 120, 139]
+    expected = [_brute_force_topk(model, dataset, u, 20) for u in users]
+    assert [R.recommend_topk(model, dataset, train_data, u, topk=20) for u in users] == expected
+    assert R.recommend_topk_batch(model, dataset, train_data, users, topk=20) == expected